@@ -0,0 +1,143 @@
+"""
+Persistent cache of accepted mark alternatives.
+
+Every yellow/red mark costs a click, a dialog load and up to six reloads in
+get_Zero_Human_Alternative. Flagged sentences repeat across chunks and
+jobs, so the alternative accepted for a sentence is stored here, keyed by
+the normalized sentence text, together with its Human score. On a cache
+hit whose score is below the current preset's threshold, the engine applies
+it directly and never opens the dialog.
+
+Location: HUMANIZER_ALTERNATIVE_CACHE (default
+~/.cache/autohumanize/alternatives.db); set it to "off" to disable the cache.
+"""
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Optional
+
+from humanizer_logging import get_logger
+from single_flight import normalize_chunk
+
+log = get_logger("alternative_cache")
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "autohumanize", "alternatives.db")
+MAX_ENTRIES = 50000
+
+
+class AlternativeCache:
+    """
+    SQLite-backed map from flagged sentence to accepted alternative.
+
+    Args:
+        path: str - Database file
+        max_entries: int - Least recently used entries beyond this are pruned
+    """
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS alternatives (
+                key TEXT PRIMARY KEY,
+                alternative TEXT NOT NULL,
+                score REAL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, sentence: str, max_score: Optional[float] = None) -> Optional[str]:
+        """
+        Return the cached alternative for *sentence*, or None.
+
+        Args:
+            sentence: str - The flagged sentence
+            max_score: float - Only return an alternative whose stored Human score is
+                below this (entries without a score never qualify)
+        """
+        key = normalize_chunk(sentence)
+        if not key:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT alternative, score FROM alternatives WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and max_score is not None and (row[1] is None or row[1] >= max_score):
+                    row = None
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE alternatives SET hits = hits + 1, last_used_at = ? WHERE key = ?",
+                        (time.time(), key)
+                    )
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                log.warning(f"Alternative cache lookup failed: {e}")
+                return None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, sentence: str, alternative: str, score: Optional[float] = None):
+        """Remember *alternative* as the accepted replacement for *sentence*"""
+        key = normalize_chunk(sentence)
+        if not key or not alternative:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                self._store(key, alternative, score, now)
+            except sqlite3.Error as e:
+                log.warning(f"Alternative cache write failed: {e}")
+
+    def _store(self, key: str, alternative: str, score: Optional[float], now: float):
+        self._conn.execute(
+            "INSERT INTO alternatives (key, alternative, score, created_at, last_used_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+            "alternative = excluded.alternative, score = excluded.score, last_used_at = excluded.last_used_at",
+            (key, alternative, score, now, now)
+        )
+        self._puts += 1
+        if self._puts % 500 == 0:
+            self._conn.execute(
+                "DELETE FROM alternatives WHERE key IN (SELECT key FROM alternatives "
+                "ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        self._conn.commit()
+
+
+_cache = None
+_cache_lock = Lock()
+
+
+def get_alternative_cache() -> Optional[AlternativeCache]:
+    """
+    Return the process-wide cache, opening it on first use; None when disabled
+    or when the database cannot be opened.
+    """
+    global _cache
+    path = os.environ.get("HUMANIZER_ALTERNATIVE_CACHE", DEFAULT_CACHE_PATH)
+    if path.strip().lower() in ("", "0", "off", "false", "no"):
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.path != path:
+            try:
+                _cache = AlternativeCache(path)
+            except (OSError, sqlite3.Error) as e:
+                log.warning(f"Alternative cache disabled, cannot open {path}: {e}")
+                return None
+        return _cache
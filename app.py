@@ -9,6 +9,10 @@ from docx import Document
 from docx.shared import Pt
 from io import BytesIO
 from datetime import datetime
+import uuid
+import queue
+import threading
+import contextvars
 
 # Function to check and install Playwright browsers
 def ensure_playwright_installed():
@@ -86,12 +90,21 @@ if not st.session_state.playwright_checked:
 
 # Now import the texttohuman module
 from texttohuman import (
-    get_huminizer_chrome_driver,
-    get_texttohuman_humanizer_final,
-    read_docx_with_spacing, # Kept for compatibility, though not used in new DOCX flow
     split_text_preserve_paragraphs_and_newlines,
-    read_docx_and_humanize # New function for DOCX processing
+    read_docx_and_humanize, # New function for DOCX processing
+    humanize_chunks,
+    humanize_chunks_two_phase
 )
+from browser_slot import BrowserSlot
+from process_pool import ProcessHumanizerPool, default_process_count
+from chunk_queue import QueueHumanizerPool, open_queue
+from scheduler import SchedulerHumanizer, get_shared_scheduler
+from presets import DEFAULT_PRESET, PRESETS, refine_deadline_for
+from deadlines import job_deadline
+from chunk_stats import recommended_chunk_size
+from job_progress import JobProgress, driver_concurrency
+from tracing import span
+from humanizer_logging import log_context, new_job_id
 
 # Page configuration
 st.set_page_config(
@@ -116,6 +129,8 @@ if 'docx_buffer' not in st.session_state:
     st.session_state.docx_buffer = None
 if 'input_method' not in st.session_state:
     st.session_state.input_method = "Type/Paste Text"
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:12] # Fair-share key for the shared scheduler
 if 'dark_mode' not in st.session_state:
     st.session_state.dark_mode = False # Default to light mode
 
@@ -364,32 +379,128 @@ def save_docx_to_output(buffer, filename):
         st.error(f"❌ Error saving DOCX: {str(e)}")
         return None
 
+def open_humanizer():
+    """
+    Return the browser driver for a job: the shared queue when HUMANIZER_QUEUE_URL
+    is set, the deployment-wide fair-share scheduler when HUMANIZER_SHARED_WORKERS
+    is set, a ProcessHumanizerPool when more than one browser process is selected,
+    otherwise a single BrowserSlot.
+    """
+    if os.environ.get('HUMANIZER_QUEUE_URL'):
+        return QueueHumanizerPool(open_queue(os.environ['HUMANIZER_QUEUE_URL']))
+    shared_scheduler = get_shared_scheduler()
+    if shared_scheduler is not None:
+        return SchedulerHumanizer(shared_scheduler, st.session_state.session_id)
+    if st.session_state.get('browser_processes', 1) > 1:
+        return ProcessHumanizerPool(processes=st.session_state.browser_processes, headless=True)
+    # BrowserSlot recycles the page when memory limits are hit
+    return BrowserSlot(headless=True, debug=False)
+
+def effective_chunk_size():
+    """
+    Chunk size for the next job: the autotuner's recommendation when
+    Auto Chunk Size is on, otherwise the slider value.
+    """
+    if st.session_state.get('auto_chunk_size'):
+        return recommended_chunk_size(st.session_state.get('preset'))
+    return st.session_state.chunk_size
+
+def run_on_worker_thread(job):
+    """
+    Run *job(post)* on a background thread and apply its UI updates here, on
+    the Streamlit script thread.
+    
+    Chunk callbacks fire on pool and scheduler threads, where Streamlit
+    elements must not be touched, so they only call post(function, *args).
+    The calls are queued and run here in order while the job runs. The
+    driver must be entered inside *job*, as Playwright objects are bound to
+    the thread that created them.
+    
+    Returns:
+        The job's return value; its exception is re-raised here
+    """
+    updates = queue.Queue()
+    outcome = {}
+    # Carry the job id and the current span over to the worker thread
+    context = contextvars.copy_context()
+    
+    def target():
+        try:
+            outcome['result'] = context.run(job, lambda *call: updates.put(call))
+        except BaseException as e:
+            outcome['error'] = e
+    
+    worker = threading.Thread(target=target, name="humanize-job", daemon=True)
+    worker.start()
+    while worker.is_alive() or not updates.empty():
+        try:
+            function, *args = updates.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        function(*args)
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('result')
+
 def process_text_chunks(text, driver, chunk_size):
     """
     Splits text into chunks, humanizes each chunk, and returns the combined result.
+    *driver* is entered on a worker thread (see run_on_worker_thread).
     """
-    final_humanized_text = ""
     chunks = split_text_preserve_paragraphs_and_newlines(text, chunk_size)
     
     st.info(f"Text split into {len(chunks)} chunks for processing.")
     
-    for i, chunk in enumerate(chunks, 1):
-        st.info(f"Processing Chunk {i}/{len(chunks)}...")
+    progress = JobProgress([len(chunk.split()) for chunk in chunks], concurrency=driver_concurrency(driver))
+    progress_bar = st.progress(0.0, text=progress.describe())
+    
+    def show_chunk_done(index, result):
+        progress_bar.progress(progress.fraction, text=progress.describe())
+        if not result:
+            st.warning(f"Chunk {index + 1} returned no result. Skipping.")
+    
+    preset = st.session_state.get('preset')
+    two_phase = st.session_state.get('two_phase')
+    refine_deadline = refine_deadline_for(preset)
+    deadline = job_deadline()  # HUMANIZER_JOB_TIMEOUT, if set
+    
+    if two_phase:
+        if hasattr(driver, 'humanize_all'):
+            st.info("Drafts need a single browser; with several workers each chunk appears once refined.")
+        # Show the unrefined text as it arrives and swap in each chunk's refined text
+        shown = [None] * len(chunks)
+        draft_box = st.empty()
         
-        try:
-            result = get_texttohuman_humanizer_final(chunk, driver, save_debug=False)
-            if result:
-                # Use a single newline to join chunks, as the chunk content already contains internal newlines
-                final_humanized_text += result + "\n"
-            else:
-                st.warning(f"Chunk {i} returned no result. Skipping.")
-                
-        except Exception as e:
-            st.error(f"Error processing chunk {i}: {e}")
-            # Continue with next chunk instead of failing completely
-            continue
-            
-    return final_humanized_text.strip()
+        def show_draft(index, result):
+            shown[index] = result or shown[index]
+            draft_box.text("\n".join(text for text in shown if text))
+    
+    def job(post):
+        def on_chunk_done(index, result):
+            progress.chunk_done(index, result)
+            post(show_chunk_done, index, result)
+            if two_phase:
+                post(show_draft, index, result)
+        
+        with driver:
+            if two_phase:
+                return humanize_chunks_two_phase(chunks, driver,
+                                                 first_pass_callback=lambda index, result: post(show_draft, index, result),
+                                                 progress_callback=on_chunk_done, preset=preset,
+                                                 refine_deadline=refine_deadline, deadline=deadline)
+            return humanize_chunks(chunks, driver, progress_callback=on_chunk_done, save_debug=False,
+                                   preset=preset, refine_deadline=refine_deadline, deadline=deadline)
+    
+    with log_context(job=new_job_id()), \
+         span("process_text_chunks", chunk_size=chunk_size, chunks=len(chunks),
+              words=len(text.split()), preset=preset or ""):
+        results = run_on_worker_thread(job)
+    if two_phase:
+        # The finished text is shown in the output area
+        draft_box.empty()
+    
+    # Use a single newline to join chunks, as the chunk content already contains internal newlines
+    return "\n".join(result for result in results if result).strip()
 
 def handle_process_click():
     """
@@ -408,14 +519,29 @@ def handle_process_click():
         
         with st.spinner("Initializing browser and humanizing DOCX... This may take a moment."):
             try:
-                # Initialize driver (PlaywrightHumanizer context manager handles it)
-                from texttohuman import PlaywrightHumanizer
-                with PlaywrightHumanizer(headless=True, debug=False) as driver:
-                    st.session_state.docx_buffer = read_docx_and_humanize(
-                        st.session_state.uploaded_file_path, 
-                        driver, 
-                        chunk_size=st.session_state.chunk_size
-                    )
+                progress_bar = st.progress(0.0, text="Planning chunks...")
+                
+                def show_progress(progress):
+                    progress_bar.progress(progress.fraction, text=progress.describe())
+                
+                # Initialize driver (single browser slot or process pool)
+                driver = open_humanizer()
+                # Session state is only readable on the script thread
+                file_path = st.session_state.uploaded_file_path
+                chunk_size = effective_chunk_size()
+                preset = st.session_state.preset
+                
+                def humanize_docx(post):
+                    with driver:
+                        return read_docx_and_humanize(
+                            file_path, 
+                            driver, 
+                            chunk_size=chunk_size,
+                            preset=preset,
+                            progress_callback=lambda progress: post(show_progress, progress)
+                        )
+                
+                st.session_state.docx_buffer = run_on_worker_thread(humanize_docx)
                 
                 if st.session_state.docx_buffer:
                     st.success("✅ DOCX Humanization Complete!")
@@ -454,14 +580,12 @@ def handle_process_click():
             
         with st.spinner("Initializing browser and humanizing text... This may take a moment."):
             try:
-                # Initialize driver (PlaywrightHumanizer context manager handles it)
-                from texttohuman import PlaywrightHumanizer
-                with PlaywrightHumanizer(headless=True, debug=False) as driver:
-                    humanized_text = process_text_chunks(
-                        input_text, 
-                        driver, 
-                        st.session_state.chunk_size
-                    )
+                # Initialize driver (single browser slot or process pool)
+                humanized_text = process_text_chunks(
+                    input_text, 
+                    open_humanizer(), 
+                    effective_chunk_size()
+                )
                 
                 if humanized_text:
                     st.session_state.humanized_text = humanized_text
@@ -503,6 +627,13 @@ with st.sidebar:
         key="dark_mode_toggle"
     )
     
+    auto_chunk_size = st.toggle(
+        "🎯 Auto Chunk Size",
+        value=False,
+        key="auto_chunk_size",
+        help="Pick the chunk size from recorded chunk timings: as large as possible without risking timeouts"
+    )
+    
     chunk_size = st.slider(
         "Chunk Size (words)",
         min_value=500,
@@ -510,8 +641,39 @@ with st.sidebar:
         value=2000,
         step=100,
         key="chunk_size",
+        disabled=auto_chunk_size,
         help="Split long texts into chunks of this size"
     )
+    if auto_chunk_size:
+        st.caption(f"Auto: {recommended_chunk_size(st.session_state.get('preset'))} words per chunk")
+    
+    preset_names = list(PRESETS)
+    env_preset = os.environ.get('HUMANIZER_PRESET', DEFAULT_PRESET).strip().lower()
+    preset = st.selectbox(
+        "Speed / Quality",
+        preset_names,
+        index=preset_names.index(env_preset if env_preset in PRESETS else DEFAULT_PRESET),
+        key="preset",
+        help="fast: fewer alternative reloads and at most about a minute of sentence refinement per job; "
+             "balanced: the default; thorough: more reloads and longer waits"
+    )
+    
+    browser_processes = st.number_input(
+        "Browser Processes",
+        min_value=1,
+        max_value=max(1, os.cpu_count() or 1),
+        value=min(default_process_count(), os.cpu_count() or 1) if os.environ.get('HUMANIZER_PROCESSES') else 1,
+        step=1,
+        key="browser_processes",
+        help="Run chunks in parallel, one browser per process (each needs roughly 300-500 MB of RAM)"
+    )
+    
+    st.toggle(
+        "⚡ Show Draft First",
+        value=False,
+        key="two_phase",
+        help="Show each chunk's unrefined output as soon as the site returns it, then replace it with its refined text. Earlier chunks are refined while the site works on the next one, so drafts may arrive a little later than the site finishes them (text input, single browser; with several workers chunks appear once refined)"
+    )
     
     st.markdown("---")
     st.markdown("### 📊 Statistics")
@@ -0,0 +1,124 @@
+"""
+Optional per-job artifact store for debugging output.
+
+Disabled by default. When HUMANIZER_ARTIFACT_DIR is set (or configure_artifacts()
+is called) the engine's intermediate texts are written by a background thread to
+
+    <artifact dir>/<job id>/chunk_<n>[_piece_<piece>][_attempt_<n>]_<name>.txt
+
+so the hot path only pays for a queue put, and concurrent workers never share
+a file. Bisection halves and salvaged tails run inside artifact_piece(), and
+a hedged second attempt of a chunk carries an ``attempt`` log field, so
+neither overwrites the files of the chunk it belongs to.
+"""
+import atexit
+import os
+import queue
+import uuid
+from threading import Thread
+from typing import Optional
+
+from humanizer_logging import current_log_context, get_logger, log_context
+
+log = get_logger("artifacts")
+
+
+class ArtifactSink:
+    """
+    Writes text artifacts asynchronously below *root_dir*.
+
+    Args:
+        root_dir: str - Base directory for all jobs
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._queue = queue.SimpleQueue()
+        self._thread = Thread(target=self._run, name="artifact-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, relative_path: str, content: str):
+        """Queue *content* for writing; returns immediately"""
+        self._queue.put((relative_path, content))
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            relative_path, content = item
+            path = os.path.join(self.root_dir, relative_path)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(content)
+            except OSError as e:
+                log.warning(f"Failed to write artifact: {e}")
+
+
+_sink: Optional[ArtifactSink] = None
+
+
+def configure_artifacts(root_dir: Optional[str]):
+    """
+    Enable the artifact store under *root_dir*, or disable it when None is given.
+    """
+    global _sink
+    if _sink is not None:
+        _sink.close()
+    _sink = ArtifactSink(root_dir) if root_dir else None
+
+
+def artifacts_enabled() -> bool:
+    """Whether the artifact store is enabled, so callers can skip collecting artifacts"""
+    return _sink is not None
+
+
+def artifact_piece(name: str):
+    """
+    Context manager for work on part of a chunk (a bisection half, a salvaged
+    tail); nested pieces are joined with dots, e.g. "half1.tail1".
+    """
+    outer = current_log_context().get("piece")
+    return log_context(piece=f"{outer}.{name}" if outer else name)
+
+
+def _artifact_prefix(context: dict) -> str:
+    chunk = context.get("chunk")
+    prefix = f"chunk_{chunk:04d}" if isinstance(chunk, int) else f"call_{uuid.uuid4().hex[:8]}"
+    if context.get("piece"):
+        prefix += f"_piece_{context['piece']}"
+    if context.get("attempt"):
+        prefix += f"_attempt_{context['attempt']}"
+    return prefix
+
+
+def save_chunk_artifacts(**artifacts: str):
+    """
+    Store named text artifacts for the current job/chunk (taken from the log context).
+    No-op unless the artifact store is enabled.
+    """
+    sink = _sink
+    if sink is None:
+        return
+    context = current_log_context()
+    job = str(context.get("job") or "adhoc")
+    prefix = _artifact_prefix(context)
+    for name, content in artifacts.items():
+        if content is not None:
+            sink.write(os.path.join(job, f"{prefix}_{name}.txt"), content)
+
+
+if os.environ.get("HUMANIZER_ARTIFACT_DIR"):
+    configure_artifacts(os.environ["HUMANIZER_ARTIFACT_DIR"])
+
+
+@atexit.register
+def _flush_on_exit():
+    if _sink is not None:
+        _sink.close()
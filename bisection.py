@@ -0,0 +1,123 @@
+"""
+Retrying a failed chunk in smaller pieces.
+
+When a chunk fails as a whole, bisect_failed_chunk() splits it in half at a
+paragraph or sentence boundary and runs each half, splitting again any half
+that fails. One bad paragraph then costs one failed piece per level of
+splitting instead of the whole chunk. Pieces that still fail at the smallest
+size keep their original text.
+"""
+import math
+import os
+import re
+
+from artifacts import artifact_piece
+from deadlines import deadline_passed
+from humanizer_logging import get_logger, kv
+from tracing import span
+
+log = get_logger("bisect")
+
+# Failed chunks are split in half and retried down to pieces of this many words (0 = off)
+MIN_BISECT_WORDS = max(0, int(os.environ.get("HUMANIZER_MIN_BISECT_WORDS", "150")))
+# Failed pieces allowed on top of one per level of splitting before bisection
+# gives up on a chunk (the site is probably down)
+MAX_BISECT_FAILURES = 2
+
+
+def max_bisect_failures(words: int, min_words: int) -> int:
+    """
+    Failed pieces after which bisecting a chunk of *words* words gives up.
+
+    A single bad paragraph fails one piece on every level of splitting, so
+    the limit grows with the number of levels, ceil(log2(words / min_words)),
+    plus MAX_BISECT_FAILURES to spare.
+    """
+    levels = math.ceil(math.log2(words / min_words)) if words > min_words else 0
+    return levels + MAX_BISECT_FAILURES
+
+
+def split_in_half(text):
+    """
+    Split *text* into two parts of roughly equal word count, at a paragraph
+    boundary, or at a sentence boundary when it is a single paragraph.
+
+    Returns:
+        Tuple[str, str, str]: (left, separator, right), or None if *text* has
+        no boundary to split at
+    """
+    parts = re.split(r'(\s*\n\s*)', text.strip())
+    if len(parts) < 3:
+        parts = re.split(r'(?<=[.!?])(\s+)', text.strip())
+    if len(parts) < 3:
+        return None
+
+    unit_words = [len(unit.split()) for unit in parts[0::2]]
+    half = sum(unit_words) / 2
+    best_cut, best_gap, words_before = 1, None, 0
+    for cut in range(1, len(unit_words)):
+        words_before += unit_words[cut - 1]
+        gap = abs(words_before - half)
+        if best_gap is None or gap < best_gap:
+            best_cut, best_gap = cut, gap
+    return ''.join(parts[:2 * best_cut - 1]), parts[2 * best_cut - 1], ''.join(parts[2 * best_cut:])
+
+
+def bisect_failed_chunk(humanize_text, run, min_words=None, deadline=None):
+    """
+    Retry a failed chunk piece by piece: split it in half at a paragraph or
+    sentence boundary, run each half, and split again any half that fails,
+    down to pieces of *min_words* words. A piece that still fails keeps its
+    original text, so one bad paragraph does not cost the whole chunk.
+
+    Args:
+        humanize_text: str - The chunk that failed
+        run: callable(text) -> Optional[str] - Humanizes one piece
+        min_words: int - Smallest piece to retry (default: HUMANIZER_MIN_BISECT_WORDS; 0 = off)
+        deadline: float - Job deadline (see deadlines.py)
+
+    Returns:
+        str: The stitched result, or None if nothing could be retried or
+        more pieces failed than max_bisect_failures() allows
+    """
+    min_words = MIN_BISECT_WORDS if min_words is None else min_words
+    if not min_words or len(humanize_text.split()) < 2 * min_words:
+        return None
+    max_failures = max_bisect_failures(len(humanize_text.split()), min_words)
+    failures = [0]
+    kept_words = [0]
+
+    def humanize_piece(piece, depth):
+        if failures[0] >= max_failures or deadline_passed(deadline):
+            return None
+        halves = split_in_half(piece) if len(piece.split()) >= 2 * min_words else None
+        if halves is None:
+            # Smallest piece and still failing: keep the original wording
+            kept_words[0] += len(piece.split())
+            return piece
+        left, separator, right = halves
+        outputs = []
+        for number, half in enumerate((left, right), 1):
+            with artifact_piece(f"half{number}"), \
+                 span("bisect", depth=depth, words=len(half.split())) as half_span:
+                output = run(half)
+                if output is None:
+                    failures[0] += 1
+                    half_span.set_attribute("failed", True)
+                    output = humanize_piece(half, depth + 1)
+            if output is None:
+                return None
+            outputs.append(output)
+        return outputs[0] + separator + outputs[1]
+
+    log.warning("Chunk failed, retrying it in smaller pieces", extra=kv(
+        words=len(humanize_text.split()), min_words=min_words, max_failures=max_failures
+    ))
+    with span("bisect_failed_chunk", words=len(humanize_text.split()), min_words=min_words) as bisect_span:
+        result = humanize_piece(humanize_text, 1)
+        bisect_span.set_attributes(failures=failures[0], unhumanized_words=kept_words[0], success=result is not None)
+    if result is None:
+        log.error("Bisection gave up on chunk", extra=kv(failures=failures[0]))
+    elif kept_words[0]:
+        log.warning("Chunk stitched together with pieces left unhumanized", extra=kv(unhumanized_words=kept_words[0]))
+    return result
@@ -0,0 +1,151 @@
+"""
+Memory measurements for the Chromium processes started by this Python process.
+
+Playwright starts its driver as a child of Python and Chromium as a child of
+the driver, so every Chromium process we own is a descendant of os.getpid().
+Several browsers can share one Python process (one per BrowserSlot), so a
+single browser is measured by its browser process, found through a marker
+switch on its command line (see PlaywrightHumanizer.browser_marker), plus
+that process's descendants. count_marked_browsers() counts the marked
+browsers of every Python process, so slots in different processes can
+share one memory budget.
+RSS figures come from /proc and are only available on Linux; elsewhere the
+functions return None.
+"""
+import os
+from typing import Dict, List, Optional
+
+PROC_DIR = "/proc"
+# Prefix of the switch that marks a humanizer browser on its command line
+BROWSER_MARKER_PREFIX = "--humanizer-browser="
+
+
+def _read_proc_file(pid: int, name: str) -> Optional[str]:
+    try:
+        with open(os.path.join(PROC_DIR, str(pid), name), "rb") as f:
+            return f.read().decode("utf-8", "replace")
+    except OSError:
+        return None
+
+
+def _children_map() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir(PROC_DIR):
+        if not entry.isdigit():
+            continue
+        stat = _read_proc_file(int(entry), "stat")
+        if not stat:
+            continue
+        # The command name may contain spaces, so parse after the closing paren
+        fields = stat[stat.rfind(")") + 2:].split()
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    return children
+
+
+def _rss_bytes(pid: int) -> int:
+    status = _read_proc_file(pid, "status") or ""
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    return 0
+
+
+def _cmdline(pid: int) -> str:
+    return (_read_proc_file(pid, "cmdline") or "").replace("\0", " ")
+
+
+def find_browser_pid(marker: str) -> Optional[int]:
+    """PID of the Chromium browser process whose command line contains *marker*"""
+    for entry in os.listdir(PROC_DIR):
+        if entry.isdigit():
+            args = (_read_proc_file(int(entry), "cmdline") or "").split("\0")
+            # Child processes (--type=renderer, gpu-process, ...) are found through the tree
+            if marker in args and not any(arg.startswith("--type=") for arg in args):
+                return int(entry)
+    return None
+
+
+def count_marked_browsers() -> Optional[int]:
+    """
+    Number of humanizer browsers running on this machine (or in this
+    container), across all Python processes; None when /proc is not available.
+    """
+    if not os.path.isdir(PROC_DIR):
+        return None
+    count = 0
+    try:
+        entries = os.listdir(PROC_DIR)
+    except OSError:
+        return None
+    for entry in entries:
+        if entry.isdigit():
+            args = (_read_proc_file(int(entry), "cmdline") or "").split("\0")
+            if (any(arg.startswith(BROWSER_MARKER_PREFIX) for arg in args)
+                    and not any(arg.startswith("--type=") for arg in args)):
+                count += 1
+    return count
+
+
+def chromium_memory(root_pid: Optional[int] = None,
+                    browser_marker: Optional[str] = None) -> Optional[Dict[str, int]]:
+    """
+    Sum the resident memory of Chromium processes below *root_pid* (default: this process).
+
+    Args:
+        root_pid: int - Process whose descendants are measured
+        browser_marker: str - Measure only the browser launched with this command-line
+            switch, and its child processes (overrides *root_pid*)
+
+    Returns:
+        dict: {'browser': bytes, 'renderer': bytes, 'other': bytes, 'total': bytes,
+               'renderers': count}, or None when /proc is not available or the
+               marked browser is not running
+    """
+    if not os.path.isdir(PROC_DIR):
+        return None
+    try:
+        if browser_marker:
+            browser_pid = find_browser_pid(browser_marker)
+            if browser_pid is None:
+                return None
+        children = _children_map()
+    except OSError:
+        return None
+
+    usage = {'browser': 0, 'renderer': 0, 'other': 0, 'total': 0, 'renderers': 0}
+    stack = [browser_pid] if browser_marker else list(children.get(root_pid or os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        cmdline = _cmdline(pid)
+        if "chrom" not in cmdline.lower():
+            continue
+        rss = _rss_bytes(pid)
+        if "--type=renderer" in cmdline:
+            usage['renderer'] += rss
+            usage['renderers'] += 1
+        elif "--type=" in cmdline:
+            usage['other'] += rss
+        else:
+            usage['browser'] += rss
+        usage['total'] += rss
+    return usage
+
+
+def page_js_heap_bytes(page) -> Optional[int]:
+    """
+    Return the JS heap currently used by *page*, read through a CDP session.
+    """
+    try:
+        session = page.context.new_cdp_session(page)
+        try:
+            session.send("Performance.enable")
+            metrics = session.send("Performance.getMetrics")["metrics"]
+        finally:
+            session.detach()
+    except Exception:
+        return None
+    for metric in metrics:
+        if metric.get("name") == "JSHeapUsedSize":
+            return int(metric["value"])
+    return None
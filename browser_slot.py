@@ -0,0 +1,275 @@
+"""
+Long-running browser slot with a memory watchdog.
+
+A BrowserSlot owns one PlaywrightHumanizer and serves chunks on its page.
+Before each chunk it checks how many chunks the page has served, the page's
+JS heap and the RSS of its own browser's processes, and recycles the page,
+the browser context or the whole browser when a limit is exceeded. Recycling
+only ever happens between chunks, so in-flight work is never interrupted.
+
+The slot also listens for page crash/close and browser disconnect events.
+When the browser dies under a chunk, the slot respawns what was lost and runs
+the same chunk again, so a renderer crash costs one retry instead of every
+remaining chunk of the document.
+"""
+import os
+from typing import Optional
+
+from bisection import bisect_failed_chunk
+from browser_metrics import chromium_memory, count_marked_browsers, page_js_heap_bytes
+from deadlines import DeadlineExceeded, deadline_passed
+from humanizer_logging import get_logger, kv
+from tracing import current_span
+from texttohuman import PlaywrightHumanizer, get_texttohuman_humanizer_final
+
+log = get_logger("slot")
+
+RECYCLE_PAGE = "page"
+RECYCLE_CONTEXT = "context"
+RECYCLE_BROWSER = "browser"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class RecycleLimits:
+    """
+    Thresholds that trigger recycling. A value of 0 disables that check.
+
+    Args:
+        max_chunks_per_page: int - Chunks a page may serve before it is replaced
+        max_pages_per_context: int - Page recycles before the context is replaced too
+        max_page_heap_mb: int - JS heap of the page that triggers a page recycle
+        max_browser_rss_mb: int - RSS of the slot's browser (browser process and
+            its children) that triggers a browser restart
+        max_total_browser_rss_mb: int - RSS budget shared by all humanizer browsers
+            on the machine (every slot, pool process and worker); each browser
+            gets an equal share, capped by max_browser_rss_mb
+        max_crash_retries: int - Times a chunk is re-run after the page or browser died
+    """
+
+    def __init__(self, max_chunks_per_page: int = 20, max_pages_per_context: int = 5,
+                 max_page_heap_mb: int = 400, max_browser_rss_mb: int = 1400,
+                 max_total_browser_rss_mb: int = 1400, max_crash_retries: int = 2):
+        self.max_chunks_per_page = max_chunks_per_page
+        self.max_pages_per_context = max_pages_per_context
+        self.max_page_heap_mb = max_page_heap_mb
+        self.max_browser_rss_mb = max_browser_rss_mb
+        self.max_total_browser_rss_mb = max_total_browser_rss_mb
+        self.max_crash_retries = max_crash_retries
+
+    def browser_rss_limit_mb(self) -> int:
+        """
+        RSS limit of one browser right now (0 = off): max_browser_rss_mb, or
+        this browser's share of max_total_browser_rss_mb when that is smaller.
+        """
+        limit = self.max_browser_rss_mb
+        if self.max_total_browser_rss_mb:
+            share = self.max_total_browser_rss_mb // max(1, count_marked_browsers() or 1)
+            limit = min(limit, share) if limit else share
+        return limit
+
+    @classmethod
+    def from_env(cls) -> "RecycleLimits":
+        defaults = cls()
+        return cls(
+            max_chunks_per_page=_env_int("HUMANIZER_MAX_CHUNKS_PER_PAGE", defaults.max_chunks_per_page),
+            max_pages_per_context=_env_int("HUMANIZER_MAX_PAGES_PER_CONTEXT", defaults.max_pages_per_context),
+            max_page_heap_mb=_env_int("HUMANIZER_MAX_PAGE_HEAP_MB", defaults.max_page_heap_mb),
+            max_browser_rss_mb=_env_int("HUMANIZER_MAX_BROWSER_RSS_MB", defaults.max_browser_rss_mb),
+            max_total_browser_rss_mb=_env_int("HUMANIZER_MAX_TOTAL_BROWSER_RSS_MB",
+                                              defaults.max_total_browser_rss_mb),
+            max_crash_retries=_env_int("HUMANIZER_MAX_CRASH_RETRIES", defaults.max_crash_retries),
+        )
+
+
+class BrowserSlot:
+    """
+    A recyclable browser page that humanizes chunks one at a time.
+
+    Usage:
+        with BrowserSlot(headless=True) as slot:
+            text = slot.humanize(chunk)
+
+    Args:
+        headless, debug, block_resources: Passed to PlaywrightHumanizer
+        limits: RecycleLimits - Watchdog thresholds (default: from environment)
+        name: str - Label used in logs
+    """
+
+    def __init__(self, headless=True, debug=False, block_resources=None,
+                 limits: Optional[RecycleLimits] = None, name: str = "slot"):
+        self.humanizer = PlaywrightHumanizer(headless=headless, debug=debug, block_resources=block_resources)
+        self.limits = limits or RecycleLimits.from_env()
+        self.name = name
+        self.page = None
+        self.chunks_served = 0
+        self.chunks_on_page = 0
+        self.pages_on_context = 0
+        self.recycles = {RECYCLE_PAGE: 0, RECYCLE_CONTEXT: 0, RECYCLE_BROWSER: 0}
+        self.crashes = 0
+        self._page_lost = False
+        self._browser_lost = False
+
+    def __enter__(self):
+        self.page = self.humanizer.__enter__()
+        self._watch()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.humanizer.__exit__(exc_type, exc_val, exc_tb)
+        self.page = None
+
+    def _watch(self):
+        """Subscribe to crash/close events of the current page and browser"""
+        page, browser = self.page, self.humanizer.browser
+        self._page_lost = False
+        self._browser_lost = False
+
+        def on_page_lost(event):
+            def handler(*_):
+                if page is self.page:
+                    log.warning("Page lost", extra=kv(slot=self.name, event=event))
+                    self._page_lost = True
+            return handler
+
+        def on_disconnected(*_):
+            if browser is self.humanizer.browser:
+                log.warning("Browser disconnected", extra=kv(slot=self.name))
+                self._browser_lost = True
+
+        page.on("crash", on_page_lost("crash"))
+        page.on("close", on_page_lost("close"))
+        if browser is not None and not getattr(browser, "_humanizer_watched", False):
+            browser.on("disconnected", on_disconnected)
+            browser._humanizer_watched = True
+
+    def lost_level(self) -> Optional[str]:
+        """
+        Return the recycle level needed to replace a crashed page or browser, or None.
+        """
+        browser = self.humanizer.browser
+        if self._browser_lost or browser is None or not browser.is_connected():
+            return RECYCLE_BROWSER
+        if self._page_lost or self.page is None or self.page.is_closed():
+            return RECYCLE_CONTEXT
+        return None
+
+    def check_limits(self) -> Optional[str]:
+        """
+        Return the recycle level the slot needs right now, or None if it is healthy.
+        """
+        limits = self.limits
+        rss_limit_mb = limits.browser_rss_limit_mb()
+        if rss_limit_mb:
+            # Only this slot's browser: other slots may share the Python process
+            memory = chromium_memory(browser_marker=self.humanizer.browser_marker)
+            if memory and memory['total'] > rss_limit_mb * 2**20:
+                log.info("Chromium RSS over limit", extra=kv(
+                    slot=self.name, rss_mb=memory['total'] // 2**20, limit_mb=rss_limit_mb
+                ))
+                return RECYCLE_BROWSER
+
+        page_full = limits.max_chunks_per_page and self.chunks_on_page >= limits.max_chunks_per_page
+        if not page_full and limits.max_page_heap_mb and self.chunks_on_page:
+            heap = page_js_heap_bytes(self.page)
+            page_full = bool(heap and heap > limits.max_page_heap_mb * 2**20)
+            if page_full:
+                log.info("Page JS heap over limit", extra=kv(
+                    slot=self.name, heap_mb=heap // 2**20, limit_mb=limits.max_page_heap_mb
+                ))
+        if not page_full:
+            return None
+        if limits.max_pages_per_context and self.pages_on_context + 1 >= limits.max_pages_per_context:
+            return RECYCLE_CONTEXT
+        return RECYCLE_PAGE
+
+    def recycle(self, level: str, deadline: Optional[float] = None):
+        """
+        Replace the page, context or browser. A failed page/context recycle
+        escalates to a full browser restart. Loading the new page is capped by
+        *deadline*; past it, DeadlineExceeded is raised without escalating and
+        the next chunk finds the old page closed and recycles again.
+        """
+        log.info("Recycling browser slot", extra=kv(
+            slot=self.name, level=level, chunks_on_page=self.chunks_on_page
+        ))
+        try:
+            if level == RECYCLE_PAGE:
+                self.page = self.humanizer.recycle_page(deadline)
+                self.pages_on_context += 1
+            elif level == RECYCLE_CONTEXT:
+                self.page = self.humanizer.recycle_context(deadline)
+                self.pages_on_context = 0
+            else:
+                self.page = self.humanizer.restart_browser(deadline)
+                self.pages_on_context = 0
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if level == RECYCLE_BROWSER:
+                raise
+            log.warning(f"Recycle failed, restarting browser: {e}", extra=kv(slot=self.name, level=level))
+            self.page = self.humanizer.restart_browser(deadline)
+            self.pages_on_context = 0
+            level = RECYCLE_BROWSER
+        self.recycles[level] += 1
+        self.chunks_on_page = 0
+        self._watch()
+
+    def refresh(self, deadline: Optional[float] = None):
+        """
+        Respawn a lost page or browser, or recycle the slot if the watchdog
+        asks for it. Runs before every chunk the slot serves; *deadline* is
+        the chunk's job deadline (see recycle).
+        """
+        level = self.lost_level() or self.check_limits()
+        if level:
+            self.recycle(level, deadline)
+
+    def humanize(self, text: str, **kwargs) -> Optional[str]:
+        """
+        Humanize one chunk, recycling the slot first if the watchdog asks for it.
+        If the page or browser dies while the chunk runs, the slot is respawned
+        and the chunk is run again (up to limits.max_crash_retries times, and
+        never after the job deadline). A chunk that still fails is retried in
+        smaller pieces (see bisect_failed_chunk). Extra keyword arguments go to
+        get_texttohuman_humanizer_final.
+        """
+        result = self._humanize_once(text, **kwargs)
+        if result is None:
+            result = bisect_failed_chunk(text, lambda piece: self._humanize_once(piece, **kwargs),
+                                         deadline=kwargs.get('deadline'))
+        return result
+
+    def _humanize_once(self, text: str, **kwargs) -> Optional[str]:
+        for attempt in range(self.limits.max_crash_retries + 1):
+            try:
+                self.refresh(kwargs.get('deadline'))
+            except DeadlineExceeded as e:
+                log.error(f"Chunk abandoned: {e}", extra=kv(slot=self.name))
+                return None
+            try:
+                result = get_texttohuman_humanizer_final(text, self.page, **kwargs)
+            finally:
+                self.chunks_on_page += 1
+                self.chunks_served += 1
+
+            lost = self.lost_level()
+            if lost is None or deadline_passed(kwargs.get('deadline')):
+                return result
+            self.crashes += 1
+            current_span().set_attribute("crash_retries", attempt + 1)
+            log.warning("Browser died during chunk, respawning and re-queueing", extra=kv(
+                slot=self.name, level=lost, attempt=attempt + 1
+            ))
+            try:
+                self.recycle(lost, kwargs.get('deadline'))
+            except DeadlineExceeded as e:
+                log.error(f"Chunk abandoned: {e}", extra=kv(slot=self.name))
+                return None
+        return None
@@ -0,0 +1,480 @@
+"""
+Shared chunk queue for spreading humanization over several machines.
+
+A submitting job puts its chunks on a queue; worker daemons
+(humanizer_worker.py) on any number of hosts claim chunks, humanize them on
+their own browsers and push the results back; the submitter reassembles them
+in document order.
+
+Backends:
+    SQLiteChunkQueue - a single SQLite file, for workers on one host (or a
+        shared volume with proper locking)
+    RedisChunkQueue - any Redis-compatible server; the client is injectable,
+        so a local stand-in such as fakeredis works for testing
+
+Claimed chunks carry a lease. If a worker dies, the lease runs out and the
+chunk is handed to another worker, up to max_attempts times.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from deadlines import remaining
+from humanizer_logging import get_logger, kv, new_job_id
+from scheduler import longest_first_order
+from site_selectors import SiteChangedError, SiteSelector
+
+log = get_logger("queue")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+# The worker found the site's markup changed; the result holds the serialized error
+STATUS_SITE_CHANGED = "site_changed"
+
+
+class ChunkTask(NamedTuple):
+    task_id: str
+    job_id: str
+    index: int
+    text: str
+    options: dict
+    attempts: int
+
+
+class ChunkQueue:
+    """
+    Interface shared by the queue backends.
+
+    Args:
+        lease_seconds: float - How long a claimed chunk stays with one worker
+        max_attempts: int - Claims per chunk before it is marked failed
+    """
+
+    def __init__(self, lease_seconds: float = 600, max_attempts: int = 3):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def submit(self, job_id: str, texts: List[str], options: Optional[dict] = None,
+               order: Optional[List[int]] = None):
+        """
+        Queue every text of *texts* as chunk 0..n-1 of *job_id*. Chunks are
+        handed out in *order* (default: document order).
+        """
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, timeout: float = 5.0) -> Optional[ChunkTask]:
+        """Take the next chunk, waiting up to *timeout* seconds; None if the queue stayed empty"""
+        raise NotImplementedError
+
+    def complete(self, task: ChunkTask, result: Optional[str], status: Optional[str] = None):
+        """
+        Store the result of a claimed chunk (None marks it failed). *status*
+        overrides the status derived from *result* (see site_changed_result).
+        """
+        raise NotImplementedError
+
+    def results(self, job_id: str) -> Dict[int, Tuple[str, Optional[str]]]:
+        """Return {index: (status, result)} for every finished chunk of *job_id*"""
+        raise NotImplementedError
+
+    def delete_job(self, job_id: str):
+        """Remove all chunks and results of *job_id*"""
+        raise NotImplementedError
+
+
+class SQLiteChunkQueue(ChunkQueue):
+    """
+    Chunk queue stored in one SQLite database file.
+
+    Args:
+        path: str - Database file
+        poll_interval: float - Seconds between polls while claim() waits
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS chunk_tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    options TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    result TEXT,
+                    worker TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_until REAL,
+                    updated_at REAL,
+                    UNIQUE (job_id, idx)
+                );
+                CREATE INDEX IF NOT EXISTS chunk_tasks_status ON chunk_tasks (status, id);
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, job_id, texts, options=None, order=None):
+        order = range(len(texts)) if order is None else order
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO chunk_tasks (job_id, idx, text, options, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, i, texts[i], json.dumps(options or {}), now) for i in order]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _try_claim(self, worker_id) -> Optional[ChunkTask]:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = conn.execute(
+                    "SELECT id, job_id, idx, text, options, attempts FROM chunk_tasks "
+                    "WHERE status = ? OR (status = ? AND lease_until < ?) ORDER BY id LIMIT 1",
+                    (STATUS_QUEUED, STATUS_RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                task_id, job_id, idx, text, options, attempts = row
+                if attempts >= self.max_attempts:
+                    # Lease expired too often: give up on this chunk
+                    conn.execute(
+                        "UPDATE chunk_tasks SET status = ?, updated_at = ? WHERE id = ?",
+                        (STATUS_FAILED, now, task_id)
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE chunk_tasks SET status = ?, worker = ?, attempts = attempts + 1, "
+                    "lease_until = ?, updated_at = ? WHERE id = ?",
+                    (STATUS_RUNNING, worker_id, now + self.lease_seconds, now, task_id)
+                )
+                conn.execute("COMMIT")
+                return ChunkTask(str(task_id), job_id, idx, text, json.loads(options), attempts + 1)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, worker_id, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            task = self._try_claim(worker_id)
+            if task is not None or time.monotonic() >= deadline:
+                return task
+            time.sleep(self.poll_interval)
+
+    def complete(self, task, result, status=None):
+        status = status or (STATUS_DONE if result is not None else STATUS_FAILED)
+        self._connect().execute(
+            "UPDATE chunk_tasks SET status = ?, result = ?, updated_at = ? WHERE id = ?",
+            (status, result, time.time(), int(task.task_id))
+        )
+
+    def results(self, job_id):
+        rows = self._connect().execute(
+            "SELECT idx, status, result FROM chunk_tasks WHERE job_id = ? AND status IN (?, ?, ?)",
+            (job_id, STATUS_DONE, STATUS_FAILED, STATUS_SITE_CHANGED)
+        ).fetchall()
+        return {idx: (status, result) for idx, status, result in rows}
+
+    def delete_job(self, job_id):
+        self._connect().execute("DELETE FROM chunk_tasks WHERE job_id = ?", (job_id,))
+
+
+class RedisChunkQueue(ChunkQueue):
+    """
+    Chunk queue on a Redis-compatible server.
+
+    Keys (all under *prefix*):
+        pending            list of task ids waiting for a worker
+        processing         list of claimed task ids
+        task:<id>          hash with the task fields, status and lease
+        tasks:<job id>     set of the job's task ids
+        results:<job id>   hash {index: JSON [status, result]}
+
+    Claiming moves a task to *processing* and sets its lease in one
+    WATCH/MULTI transaction, so requeue_expired() never sees a claimed task
+    without its lease. A deleted job's tasks are removed from the lists, and
+    results of tasks that no longer exist are dropped.
+
+    Args:
+        client: redis.Redis-compatible object (e.g. fakeredis.FakeRedis()); created from *url* if omitted
+        url: str - Redis URL used when no client is given
+        prefix: str - Key prefix
+        poll_interval: float - Seconds between polls while claim() waits
+    """
+
+    def __init__(self, client=None, url: str = "redis://localhost:6379/0", prefix: str = "humanizer",
+                 poll_interval: float = 0.5, **kwargs):
+        super().__init__(**kwargs)
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("RedisChunkQueue needs the 'redis' package: pip install redis")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+
+    def _key(self, *parts) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    @staticmethod
+    def _str(value):
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def _transaction(self, body: Callable, *watch_keys):
+        """
+        Run body(pipe) under WATCH *watch_keys*, retrying when another client
+        changed them; body calls pipe.multi() before queueing its writes and
+        returns the value to hand back.
+        """
+        from redis.exceptions import WatchError
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(*watch_keys)
+                    return body(pipe)
+                except WatchError:
+                    continue
+
+    def submit(self, job_id, texts, options=None, order=None):
+        order = range(len(texts)) if order is None else order
+        options_json = json.dumps(options or {})
+        with self.client.pipeline() as pipe:
+            for i in order:
+                task_id = uuid.uuid4().hex
+                pipe.hset(self._key("task", task_id), mapping={
+                    "job_id": job_id, "index": i, "text": texts[i], "options": options_json,
+                    "attempts": 0, "lease_until": 0,
+                })
+                pipe.sadd(self._key("tasks", job_id), task_id)
+                pipe.lpush(self._key("pending"), task_id)
+            pipe.execute()
+
+    def requeue_expired(self):
+        """Move chunks whose lease ran out back to the pending list"""
+        now = time.time()
+        for task_id in self.client.lrange(self._key("processing"), 0, -1):
+            task_id = self._str(task_id)
+            task_key = self._key("task", task_id)
+
+            def requeue(pipe):
+                lease = pipe.hget(task_key, "lease_until")
+                if lease is not None and float(self._str(lease)) >= now:
+                    pipe.unwatch()
+                    return
+                pipe.multi()
+                pipe.lrem(self._key("processing"), 1, task_id)
+                if lease is not None:
+                    pipe.rpush(self._key("pending"), task_id)
+                pipe.execute()
+
+            self._transaction(requeue, task_key, self._key("processing"))
+
+    def _try_claim(self, worker_id) -> Optional[ChunkTask]:
+        pending = self._key("pending")
+
+        def pop(pipe):
+            task_id = pipe.lindex(pending, -1)
+            if task_id is None:
+                pipe.unwatch()
+                return None
+            task_id = self._str(task_id)
+            task_key = self._key("task", task_id)
+            pipe.watch(task_key)
+            fields = {self._str(k): self._str(v) for k, v in pipe.hgetall(task_key).items()}
+            pipe.multi()
+            pipe.rpop(pending)
+            if fields:
+                # Moved and leased in one step
+                pipe.lpush(self._key("processing"), task_id)
+                pipe.hset(task_key, mapping={
+                    "attempts": int(fields["attempts"]) + 1, "worker": worker_id,
+                    "lease_until": time.time() + self.lease_seconds,
+                })
+            pipe.execute()
+            return task_id, fields
+
+        while True:
+            popped = self._transaction(pop, pending)
+            if popped is None:
+                return None
+            task_id, fields = popped
+            if not fields:
+                # Its job was deleted
+                continue
+            attempts = int(fields["attempts"]) + 1
+            task = ChunkTask(task_id, fields["job_id"], int(fields["index"]), fields["text"],
+                             json.loads(fields["options"]), attempts)
+            if attempts > self.max_attempts:
+                self.complete(task, None)
+                continue
+            return task
+
+    def claim(self, worker_id, timeout=5.0):
+        self.requeue_expired()
+        deadline = time.monotonic() + timeout
+        while True:
+            task = self._try_claim(worker_id)
+            if task is not None or time.monotonic() >= deadline:
+                return task
+            time.sleep(self.poll_interval)
+
+    def complete(self, task, result, status=None):
+        status = status or (STATUS_DONE if result is not None else STATUS_FAILED)
+        task_key = self._key("task", task.task_id)
+
+        def store(pipe):
+            exists = pipe.exists(task_key)
+            pipe.multi()
+            if exists:
+                pipe.hset(self._key("results", task.job_id), task.index, json.dumps([status, result]))
+            pipe.lrem(self._key("processing"), 1, task.task_id)
+            pipe.delete(task_key)
+            pipe.srem(self._key("tasks", task.job_id), task.task_id)
+            pipe.execute()
+
+        self._transaction(store, task_key)
+
+    def results(self, job_id):
+        raw = self.client.hgetall(self._key("results", job_id))
+        return {int(self._str(k)): tuple(json.loads(self._str(v))) for k, v in raw.items()}
+
+    def delete_job(self, job_id):
+        tasks_key = self._key("tasks", job_id)
+        task_ids = [self._str(task_id) for task_id in self.client.smembers(tasks_key)]
+        with self.client.pipeline() as pipe:
+            for task_id in task_ids:
+                pipe.lrem(self._key("pending"), 0, task_id)
+                pipe.lrem(self._key("processing"), 0, task_id)
+                pipe.delete(self._key("task", task_id))
+            pipe.delete(tasks_key, self._key("results", job_id))
+            pipe.execute()
+
+
+def open_queue(url: str, **kwargs) -> ChunkQueue:
+    """
+    Open a queue from a URL: ``sqlite:///path/to/queue.db``, ``redis://host:6379/0``,
+    or a plain file path (SQLite).
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisChunkQueue(url=url, **kwargs)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteChunkQueue(url, **kwargs)
+
+
+def site_changed_result(error: SiteChangedError) -> str:
+    """Serialize *error* as a queue result, for complete(..., status=STATUS_SITE_CHANGED)"""
+    return json.dumps({"stage": error.stage, "missing": [entry._asdict() for entry in error.missing]})
+
+
+def site_changed_error(result: str) -> SiteChangedError:
+    """Rebuild the error stored by site_changed_result"""
+    payload = json.loads(result)
+    return SiteChangedError(payload["stage"], [SiteSelector(**entry) for entry in payload["missing"]])
+
+
+def queue_worker_count() -> int:
+    """Worker slots expected on the shared queue, from HUMANIZER_QUEUE_WORKERS (default 1)"""
+    try:
+        return max(1, int(os.environ.get("HUMANIZER_QUEUE_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+class QueueHumanizerPool:
+    """
+    Submitting side of the shared queue: behaves like a pool for humanize_chunks
+    and read_docx_and_humanize, but the chunks run on whichever worker daemons
+    are attached to the queue.
+
+    Args:
+        queue: ChunkQueue - Shared queue
+        timeout: float - Seconds to wait for all chunks of a job
+        poll_interval: float - Seconds between result polls
+        workers: int - Worker slots attached to the queue, used for progress
+            estimates only (default: HUMANIZER_QUEUE_WORKERS)
+    """
+
+    def __init__(self, queue: ChunkQueue, timeout: float = 3600, poll_interval: float = 1.0,
+                 workers: Optional[int] = None):
+        self.queue = queue
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.workers = workers or queue_worker_count()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def humanize_all(self, texts: List[str], progress_callback: Optional[Callable] = None,
+                     **kwargs) -> List[Optional[str]]:
+        job_id = new_job_id()
+        # Longest chunks first so no large chunk is left running alone at the end
+        self.queue.submit(job_id, texts, kwargs, order=longest_first_order(texts))
+        log.info("Submitted chunks to shared queue", extra=kv(queue_job=job_id, chunks=len(texts)))
+
+        results: List[Optional[str]] = [None] * len(texts)
+        reported = set()
+        # Workers give up on chunks past the job deadline; stop waiting shortly after it
+        wait_seconds = self.timeout
+        if kwargs.get('deadline') is not None:
+            wait_seconds = min(wait_seconds, remaining(kwargs['deadline']) + self.poll_interval)
+        deadline = time.monotonic() + wait_seconds
+        try:
+            while len(reported) < len(texts) and time.monotonic() < deadline:
+                for index, (status, result) in self.queue.results(job_id).items():
+                    if index in reported:
+                        continue
+                    if status == STATUS_SITE_CHANGED:
+                        # Every chunk would fail the same way: give up on the job
+                        error = site_changed_error(result)
+                        log.error("Stopping the job, the site no longer matches the engine",
+                                  extra=kv(queue_job=job_id, chunk=index + 1))
+                        raise error
+                    reported.add(index)
+                    results[index] = result if status == STATUS_DONE else None
+                    if progress_callback:
+                        progress_callback(index, results[index])
+                if len(reported) < len(texts):
+                    time.sleep(self.poll_interval)
+            if len(reported) < len(texts):
+                log.error("Timed out waiting for queued chunks", extra=kv(
+                    queue_job=job_id, missing=len(texts) - len(reported)
+                ))
+        finally:
+            self.queue.delete_job(job_id)
+        return results
+
+    def humanize(self, text: str, **kwargs) -> Optional[str]:
+        return self.humanize_all([text], **kwargs)[0]
@@ -0,0 +1,219 @@
+"""
+Per-chunk statistics and the chunk-size autotuner.
+
+Every chunk the engine finishes, or fails, is recorded in a small SQLite
+store: its words, flagged marks, first-pass latency, total latency and
+whether it succeeded. From the recent history a LatencyModel fits
+
+    first-pass seconds ~ a + b * words   (has to stay within processing_timeout)
+    total seconds      ~ c + d * words   (includes mark refinement)
+
+together with the success rate per size class. recommend_chunk_size picks
+the chunk size that maximizes expected words per second,
+words * P(success) / total seconds, among sizes whose predicted first pass
+(plus two standard deviations) stays within the timeout. Large chunks
+amortize the per-chunk overhead until they start timing out.
+
+Location: HUMANIZER_STATS_DB (default ~/.cache/autohumanize/chunk_stats.db);
+set it to "off" to disable recording.
+"""
+import math
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import List, Optional, Tuple
+
+from humanizer_logging import get_logger
+from latency_stats import size_class
+
+log = get_logger("chunk_stats")
+
+DEFAULT_STATS_PATH = os.path.join(os.path.expanduser("~"), ".cache", "autohumanize", "chunk_stats.db")
+DEFAULT_CHUNK_SIZE = 2000
+MIN_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 3000
+# Successful chunks needed before the model replaces the default
+MIN_SAMPLES = 10
+
+
+class ChunkStatsStore:
+    """
+    SQLite table of per-chunk outcomes, shared by every process on the machine.
+
+    Args:
+        path: str - Database file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recorded_at REAL NOT NULL,
+                words INTEGER NOT NULL,
+                marks INTEGER,
+                first_pass_seconds REAL,
+                total_seconds REAL NOT NULL,
+                success INTEGER NOT NULL,
+                preset TEXT
+            )
+        """)
+        self._conn.commit()
+
+    def record(self, words: int, marks: Optional[int], first_pass_seconds: Optional[float],
+               total_seconds: float, success: bool, preset: Optional[str] = None):
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO chunks (recorded_at, words, marks, first_pass_seconds, total_seconds, success, preset) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (time.time(), words, marks, first_pass_seconds, total_seconds, int(success), preset)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                log.warning(f"Could not record chunk stats: {e}")
+
+    def recent(self, limit: int = 1000, preset: Optional[str] = None) -> List[Tuple]:
+        """
+        Latest (words, marks, first_pass_seconds, total_seconds, success) rows,
+        newest first; only those recorded under *preset* when it is given.
+        """
+        where, params = ("WHERE preset = ? ", (preset, limit)) if preset else ("", (limit,))
+        with self._lock:
+            try:
+                return self._conn.execute(
+                    "SELECT words, marks, first_pass_seconds, total_seconds, success FROM chunks "
+                    f"{where}ORDER BY id DESC LIMIT ?", params
+                ).fetchall()
+            except sqlite3.Error as e:
+                log.warning(f"Could not read chunk stats: {e}")
+                return []
+
+
+def _fit_line(points: List[Tuple[float, float]]) -> Tuple[float, float, float]:
+    """Least-squares y = a + b * x; returns (a, b, residual standard deviation)"""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x if var_x else 0.0
+    intercept = mean_y - slope * mean_x
+    residuals = [y - (intercept + slope * x) for x, y in points]
+    sigma = math.sqrt(sum(r * r for r in residuals) / max(1, n - 2))
+    return intercept, slope, sigma
+
+
+class LatencyModel:
+    """
+    Linear latency model fitted to recorded chunks.
+
+    Args:
+        rows: List[Tuple] - Rows from ChunkStatsStore.recent()
+    """
+
+    def __init__(self, rows: List[Tuple]):
+        succeeded = [row for row in rows if row[4]]
+        self.samples = len(succeeded)
+        first_pass = [(row[0], row[2]) for row in succeeded if row[2] is not None]
+        total = [(row[0], row[3]) for row in succeeded]
+        self.first_pass = _fit_line(first_pass) if len(first_pass) >= 2 else None
+        self.total = _fit_line(total) if len(total) >= 2 else None
+        marks = [(row[0], row[1]) for row in succeeded if row[1] is not None]
+        self.marks_per_word = sum(m for _, m in marks) / max(1, sum(w for w, _ in marks)) if marks else None
+        self._outcomes = {}
+        for row in rows:
+            ok, count = self._outcomes.get(size_class(row[0]), (0, 0))
+            self._outcomes[size_class(row[0])] = (ok + bool(row[4]), count + 1)
+
+    def predict_first_pass(self, words: int) -> Optional[float]:
+        if self.first_pass is None:
+            return None
+        intercept, slope, _ = self.first_pass
+        return intercept + slope * words
+
+    def predict_total(self, words: int) -> Optional[float]:
+        if self.total is None:
+            return None
+        intercept, slope, _ = self.total
+        return max(1e-3, intercept + slope * words)
+
+    def success_rate(self, words: int) -> float:
+        """Smoothed success rate of the size class *words* falls into"""
+        ok, count = self._outcomes.get(size_class(words), (0, 0))
+        return (ok + 1) / (count + 2)
+
+
+def recommend_chunk_size(model: LatencyModel, processing_timeout: float,
+                         min_size: int = MIN_CHUNK_SIZE, max_size: int = MAX_CHUNK_SIZE,
+                         step: int = 100, default: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Chunk size (words) with the highest expected throughput whose predicted
+    first pass stays within *processing_timeout*; *default* while the model
+    has fewer than MIN_SAMPLES successful chunks.
+    """
+    if model.samples < MIN_SAMPLES or model.total is None:
+        return default
+    margin = 2 * model.first_pass[2] if model.first_pass else 0.0
+    best_size, best_rate = min_size, None
+    for size in range(min_size, max_size + 1, step):
+        first_pass = model.predict_first_pass(size)
+        if first_pass is not None and first_pass + margin > processing_timeout and size > min_size:
+            break
+        rate = size * model.success_rate(size) / model.predict_total(size)
+        if best_rate is None or rate > best_rate:
+            best_size, best_rate = size, rate
+    return best_size
+
+
+_store = None
+_store_lock = Lock()
+
+
+def get_stats_store() -> Optional[ChunkStatsStore]:
+    """
+    Return the process-wide store, opening it on first use; None when disabled
+    or when the database cannot be opened.
+    """
+    global _store
+    path = os.environ.get("HUMANIZER_STATS_DB", DEFAULT_STATS_PATH)
+    if path.strip().lower() in ("", "0", "off", "false", "no"):
+        return None
+    with _store_lock:
+        if _store is None or _store.path != path:
+            try:
+                _store = ChunkStatsStore(path)
+            except (OSError, sqlite3.Error) as e:
+                log.warning(f"Chunk stats disabled, cannot open {path}: {e}")
+                return None
+        return _store
+
+
+def record_chunk(words: int, marks: Optional[int], first_pass_seconds: Optional[float],
+                 total_seconds: float, success: bool, preset: Optional[str] = None):
+    """Record one chunk's outcome (no-op when the store is disabled)"""
+    from presets import preset_name
+
+    store = get_stats_store()
+    if store is not None:
+        store.record(words, marks, first_pass_seconds, total_seconds, success, preset_name(preset))
+
+
+def recommended_chunk_size(preset: Optional[str] = None) -> int:
+    """
+    Autotuned chunk size for *preset*, from the chunks recorded under that
+    preset, or from all recorded chunks while it has too few samples.
+    """
+    from presets import get_settings, preset_name
+
+    store = get_stats_store()
+    if store is None:
+        return DEFAULT_CHUNK_SIZE
+    model = LatencyModel(store.recent(preset=preset_name(preset)))
+    if model.samples < MIN_SAMPLES:
+        model = LatencyModel(store.recent())
+    return recommend_chunk_size(model, get_settings(preset).processing_timeout)
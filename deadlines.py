@@ -0,0 +1,97 @@
+"""
+Job deadlines for the humanizer engine.
+
+A deadline is a wall-clock timestamp (time.time()), or None for "no limit".
+Entry points such as read_docx_and_humanize and the app's
+process_text_chunks set one from the job's time budget. It is then passed
+with every chunk, also through the process pool and the shared queue, and
+each Playwright wait, poll loop and pause takes the smaller of its own
+timeout and the time left. A job therefore finishes, or gives up on its
+remaining chunks, within the promised time.
+
+Plain timestamps are used rather than an object so that a deadline can be
+pickled and JSON-encoded. Across machines this assumes synchronized clocks.
+"""
+import os
+import time
+from typing import Optional
+
+DEFAULT_JOB_TIMEOUT = 0
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a step is started or waited for after the job deadline"""
+
+
+def job_timeout_from_env() -> float:
+    """Job time budget in seconds from HUMANIZER_JOB_TIMEOUT (0 = no limit)"""
+    try:
+        return max(0.0, float(os.environ.get("HUMANIZER_JOB_TIMEOUT", DEFAULT_JOB_TIMEOUT)))
+    except ValueError:
+        return DEFAULT_JOB_TIMEOUT
+
+
+def job_deadline(seconds: Optional[float] = None) -> Optional[float]:
+    """
+    Deadline for a job starting now.
+
+    Args:
+        seconds: float - Time budget (default: HUMANIZER_JOB_TIMEOUT); 0 or None means no limit
+    """
+    if seconds is None:
+        seconds = job_timeout_from_env()
+    return time.time() + seconds if seconds and seconds > 0 else None
+
+
+def earliest(*deadlines: Optional[float]) -> Optional[float]:
+    """The earliest of the given deadlines, ignoring None"""
+    set_deadlines = [d for d in deadlines if d is not None]
+    return min(set_deadlines) if set_deadlines else None
+
+
+def deadline_passed(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.time() >= deadline
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before *deadline* (never negative), or None without a deadline"""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def check_deadline(deadline: Optional[float], step: str = "step"):
+    """Raise DeadlineExceeded if *deadline* has passed"""
+    if deadline_passed(deadline):
+        raise DeadlineExceeded(f"Job deadline passed before {step}")
+
+
+def wait_ms(deadline: Optional[float], timeout_ms: float, step: str = "wait") -> int:
+    """
+    Timeout in milliseconds for a Playwright wait: *timeout_ms* capped by
+    the time left. Raises DeadlineExceeded when no time is left, because a
+    Playwright timeout of 0 means "wait forever".
+    """
+    left = remaining(deadline)
+    if left is None:
+        return int(timeout_ms)
+    if left <= 0:
+        raise DeadlineExceeded(f"Job deadline passed before {step}")
+    return max(1, min(int(timeout_ms), int(left * 1000)))
+
+
+def pause(seconds: float, deadline: Optional[float] = None, page=None):
+    """
+    Sleep *seconds*, cut short at *deadline*.
+    
+    With a *page* the pause is page.wait_for_timeout(), which keeps the sync
+    Playwright event loop running: route handlers (see network_policy.py)
+    only run during Playwright calls, so a plain time.sleep would hold up
+    every request of the page, the humanize request included.
+    """
+    left = remaining(deadline)
+    seconds = seconds if left is None else min(seconds, left)
+    if page is not None:
+        page.wait_for_timeout(seconds * 1000)
+    else:
+        time.sleep(seconds)
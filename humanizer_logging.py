@@ -0,0 +1,150 @@
+"""
+Queue-backed structured logging for the humanizer engine.
+
+Worker threads only build a log record and push it onto a queue; a single
+listener thread formats and writes it. Records carry the per-job context
+bound with log_context() plus any structured fields passed through kv(), and
+long text payloads are truncated so document content does not flood stdout
+or the Docker logs.
+
+Environment:
+    HUMANIZER_LOG_LEVEL: DEBUG, INFO, WARNING, ERROR (default INFO)
+    HUMANIZER_LOG_FORMAT: "text" or "json" (default text)
+    HUMANIZER_LOG_MAX_PAYLOAD: max characters kept per text field (default 200)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict
+
+LOGGER_NAME = "humanizer"
+LOG_LEVEL = os.environ.get("HUMANIZER_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("HUMANIZER_LOG_FORMAT", "text").lower()
+MAX_PAYLOAD_CHARS = int(os.environ.get("HUMANIZER_LOG_MAX_PAYLOAD", "200"))
+
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("humanizer_log_context", default={})
+_setup_lock = Lock()
+_listener = None
+
+
+def truncate(value: Any, limit: int = MAX_PAYLOAD_CHARS) -> Any:
+    """Shorten long strings to *limit* characters, noting how much was cut"""
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}... [+{len(value) - limit} chars]"
+    return value
+
+
+def kv(**fields) -> Dict[str, Any]:
+    """Build the ``extra`` argument for structured fields: log.info("msg", extra=kv(words=10))"""
+    return {"fields": fields}
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Bind fields (job id, chunk index, ...) to every record logged inside the block.
+    Nested blocks extend the outer context.
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def current_log_context() -> Dict[str, Any]:
+    return dict(_log_context.get())
+
+
+class _ContextFilter(logging.Filter):
+    """Attach the caller's context and truncated fields before the record changes thread"""
+
+    def filter(self, record):
+        record.context = _log_context.get()
+        fields = getattr(record, "fields", None) or {}
+        record.fields = {k: truncate(v) for k, v in fields.items()}
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers all formatting to the listener thread"""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = truncate(record.getMessage(), MAX_PAYLOAD_CHARS * 4)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """Render records as ``key=value`` text lines or as JSON objects"""
+
+    def __init__(self, fmt_type: str = "text"):
+        super().__init__()
+        self.fmt_type = fmt_type
+
+    def format(self, record):
+        data = {**getattr(record, "context", {}), **getattr(record, "fields", {})}
+        timestamp = datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")
+        if self.fmt_type == "json":
+            entry = {
+                "ts": timestamp,
+                "level": record.levelname,
+                "thread": record.threadName,
+                "msg": record.getMessage(),
+                **data,
+            }
+            if record.exc_text:
+                entry["exc"] = record.exc_text
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        line = f"{timestamp} {record.levelname:<7} {record.getMessage()}"
+        if data:
+            line += " | " + " ".join(f"{k}={v!r}" if isinstance(v, str) else f"{k}={v}" for k, v in data.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def _configure():
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    logger.propagate = False
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(_ContextFilter())
+    logger.addHandler(handler)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name: str = None) -> logging.Logger:
+    """
+    Return the humanizer logger (or a child of it), starting the listener on first use.
+    """
+    with _setup_lock:
+        if _listener is None:
+            _configure()
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
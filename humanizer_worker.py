@@ -0,0 +1,83 @@
+"""
+Worker daemon that pulls chunks from a shared queue and humanizes them.
+
+Run one per machine (or several), all pointing at the same queue:
+
+    python humanizer_worker.py --queue redis://queue-host:6379/0 --slots 2
+    python humanizer_worker.py --queue sqlite:///shared/queue.db
+
+Each slot is a thread with its own BrowserSlot, so a worker with --slots 2
+drives two browsers.
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+
+from browser_slot import BrowserSlot
+from chunk_queue import STATUS_SITE_CHANGED, ChunkQueue, open_queue, site_changed_result
+from humanizer_logging import get_logger, kv, log_context
+from site_selectors import SiteChangedError
+
+log = get_logger("worker")
+
+
+def run_slot(queue: ChunkQueue, worker_id: str, stop: threading.Event, headless: bool = True):
+    """
+    Claim and humanize chunks until *stop* is set.
+    """
+    with BrowserSlot(headless=headless, name=worker_id) as slot:
+        log.info("Worker slot ready", extra=kv(worker=worker_id))
+        while not stop.is_set():
+            task = queue.claim(worker_id, timeout=5.0)
+            if task is None:
+                continue
+            with log_context(job=task.job_id, chunk=task.index + 1, worker=worker_id):
+                log.info("Claimed chunk", extra=kv(attempt=task.attempts, words=len(task.text.split())))
+                try:
+                    result = slot.humanize(task.text, **task.options)
+                except SiteChangedError as e:
+                    # Reported to the submitter, which stops the whole job
+                    log.error(str(e))
+                    queue.complete(task, site_changed_result(e), status=STATUS_SITE_CHANGED)
+                    continue
+                except Exception as e:
+                    log.error(f"Error processing chunk: {e}")
+                    result = None
+                queue.complete(task, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Humanizer queue worker")
+    parser.add_argument("--queue", default=os.environ.get("HUMANIZER_QUEUE_URL", "sqlite:///humanizer_queue.db"),
+                        help="Queue URL: sqlite:///path.db or redis://host:port/db")
+    parser.add_argument("--slots", type=int, default=1, help="Browsers driven by this worker")
+    parser.add_argument("--headed", action="store_true", help="Show the browser windows")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    queue = open_queue(args.queue)
+    host = socket.gethostname()
+    threads = [
+        threading.Thread(
+            target=run_slot,
+            args=(queue, f"{host}-{os.getpid()}-{i}", stop, not args.headed),
+            name=f"slot-{i}"
+        )
+        for i in range(args.slots)
+    ]
+    for thread in threads:
+        thread.start()
+    log.info("Worker started", extra=kv(queue=args.queue, slots=args.slots))
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1.0)
+    log.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
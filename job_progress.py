@@ -0,0 +1,148 @@
+"""
+Live progress, throughput and ETA for a humanization job.
+
+The estimate starts from the chunk plan: each chunk's predicted time comes
+from the latency model fitted to recorded chunks (chunk_stats.py), or from
+the README's ~2000 words/minute while there is no history. The prediction
+is divided by the number of chunks running in parallel. As chunks
+complete, the estimate shifts towards what this job has actually achieved,
+so it corrects itself when the site is faster or slower than usual.
+"""
+import threading
+import time
+from typing import List, Optional
+
+from chunk_stats import MIN_SAMPLES, LatencyModel, get_stats_store
+from scheduler import DEFAULT_SECONDS_PER_WORD
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+def driver_concurrency(driver) -> int:
+    """Chunks a driver runs at once (a pool's processes or a scheduler's or queue's workers, otherwise 1)"""
+    return max(1, getattr(driver, 'processes', None) or getattr(driver, 'workers', None) or 1)
+
+
+def _history_model() -> Optional[LatencyModel]:
+    store = get_stats_store()
+    if store is None:
+        return None
+    model = LatencyModel(store.recent())
+    return model if model.samples >= MIN_SAMPLES and model.total is not None else None
+
+
+class JobProgress:
+    """
+    Progress of one job, updated as chunks finish. chunk_done() may be
+    called from pool or scheduler worker threads while another thread reads
+    the progress.
+
+    Args:
+        chunk_words: List[int] - Word count of every planned chunk
+        concurrency: int - Chunks processed in parallel
+        model: LatencyModel - Latency model (default: fitted to the chunk stats store)
+    """
+
+    def __init__(self, chunk_words: List[int], concurrency: int = 1, model: Optional[LatencyModel] = None):
+        self.chunk_words = list(chunk_words)
+        self.concurrency = max(1, concurrency)
+        model = model or _history_model()
+        self.predicted = [
+            model.predict_total(words) if model else words * DEFAULT_SECONDS_PER_WORD
+            for words in self.chunk_words
+        ]
+        self.started = time.monotonic()
+        self.finished = set()
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def chunk_done(self, index: int, result: Optional[str] = None):
+        with self._lock:
+            if index in self.finished:
+                return
+            self.finished.add(index)
+            if result is None:
+                self.failed += 1
+
+    def _finished(self) -> set:
+        with self._lock:
+            return set(self.finished)
+
+    @property
+    def total_chunks(self) -> int:
+        return len(self.chunk_words)
+
+    @property
+    def done_chunks(self) -> int:
+        return len(self._finished())
+
+    @property
+    def total_words(self) -> int:
+        return sum(self.chunk_words)
+
+    @property
+    def done_words(self) -> int:
+        return sum(self.chunk_words[i] for i in self._finished())
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def fraction(self) -> float:
+        return self.done_words / self.total_words if self.total_words else 1.0
+
+    @property
+    def words_per_second(self) -> float:
+        return self.done_words / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.done_chunks / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> float:
+        """Estimated seconds until the last chunk finishes"""
+        finished = self._finished()
+        if len(finished) >= self.total_chunks:
+            return 0.0
+        remaining = [p for i, p in enumerate(self.predicted) if i not in finished]
+        planned = max(0.0, sum(self.predicted) / self.concurrency - self.elapsed)
+        done_predicted = sum(p for i, p in enumerate(self.predicted) if i in finished)
+        if not done_predicted:
+            return planned
+        # Scale the plan by how this job's finished chunks compared with their prediction
+        calibrated = self.elapsed / (done_predicted / self.concurrency) * sum(remaining) / self.concurrency
+        weight = self.fraction
+        return weight * calibrated + (1 - weight) * planned
+
+    def snapshot(self) -> dict:
+        return {
+            'done_chunks': self.done_chunks,
+            'total_chunks': self.total_chunks,
+            'failed_chunks': self.failed,
+            'done_words': self.done_words,
+            'total_words': self.total_words,
+            'elapsed_seconds': round(self.elapsed, 1),
+            'eta_seconds': round(self.eta_seconds, 1),
+            'words_per_second': round(self.words_per_second, 2),
+            'chunks_per_second': round(self.chunks_per_second, 4),
+        }
+
+    def describe(self) -> str:
+        """One-line summary for progress displays"""
+        text = f"{self.done_chunks}/{self.total_chunks} chunks"
+        if self.done_chunks:
+            text += f" · {self.words_per_second:.0f} words/s · {self.chunks_per_second * 60:.1f} chunks/min"
+        if self.done_chunks < self.total_chunks:
+            text += f" · about {format_duration(self.eta_seconds)} left"
+        return text
@@ -0,0 +1,76 @@
+"""
+Observed chunk latencies, grouped by chunk size.
+
+Latency depends mostly on chunk length, so successful chunk times are kept
+per size class (a word-count bucket), in a sliding window of recent samples.
+The process pool reads percentiles from here to decide when a chunk has
+become a straggler and is worth hedging.
+"""
+import math
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Upper bounds (words) of the size classes; longer chunks share the last class
+SIZE_CLASSES = (250, 500, 1000, 1500, 2000, 3000)
+
+
+def size_class(words: int) -> int:
+    """Upper bound of the size class *words* falls into"""
+    for bound in SIZE_CLASSES:
+        if words <= bound:
+            return bound
+    return SIZE_CLASSES[-1]
+
+
+def hedge_percentile_from_env() -> float:
+    """Latency percentile after which chunks are hedged, from HUMANIZER_HEDGE_PERCENTILE (0 = off)"""
+    try:
+        return min(99.9, max(0.0, float(os.environ.get("HUMANIZER_HEDGE_PERCENTILE", "0"))))
+    except ValueError:
+        return 0.0
+
+
+class LatencyStats:
+    """
+    Thread-safe sliding window of successful chunk latencies per size class.
+
+    Args:
+        window: int - Samples kept per size class
+        min_samples: int - Samples a class needs before percentile() answers
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 5):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[int, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, words: int, seconds: float):
+        with self._lock:
+            self._samples.setdefault(size_class(words), deque(maxlen=self.window)).append(seconds)
+
+    def samples(self, words: int) -> int:
+        with self._lock:
+            return len(self._samples.get(size_class(words), ()))
+
+    def percentile(self, words: int, q: float) -> Optional[float]:
+        """
+        Nearest-rank *q*-th percentile latency (seconds) for chunks of *words*
+        words, or None while the class has fewer than min_samples samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(size_class(words), ()))
+        if len(samples) < self.min_samples:
+            return None
+        rank = max(1, math.ceil(q / 100 * len(samples)))
+        return samples[rank - 1]
+
+
+_stats = LatencyStats()
+
+
+def get_latency_stats() -> LatencyStats:
+    """Process-wide latency statistics"""
+    return _stats
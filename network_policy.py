@@ -0,0 +1,195 @@
+"""
+Request-routing policy that keeps the browser from downloading what the
+humanizer flow does not need (images, fonts, media, analytics and trackers).
+
+The policy is installed on a browser context with context.route(), so it
+applies to every page in that context. Stylesheets and scripts from the site
+itself are left alone because the textarea, buttons and mark dialog depend
+on them.
+
+Run ``python network_policy.py --benchmark`` to compare page load time and
+Chromium memory with and without blocking.
+"""
+import argparse
+import os
+import re
+import time
+from typing import Iterable, Optional
+
+from humanizer_logging import get_logger, kv
+
+log = get_logger("network")
+
+DEFAULT_BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+DEFAULT_BLOCKED_URL_PATTERNS = (
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"googlesyndication\.com",
+    r"googleadservices\.com",
+    r"doubleclick\.net",
+    r"adservice\.google\.",
+    r"connect\.facebook\.net",
+    r"facebook\.com/tr",
+    r"hotjar\.(com|io)",
+    r"clarity\.ms",
+    r"static\.cloudflareinsights\.com",
+    r"/_vercel/insights",
+    r"/_vercel/speed-insights",
+    r"plausible\.io",
+    r"posthog\.com",
+    r"segment\.(io|com)",
+    r"mixpanel\.com",
+    r"intercom\.io",
+    r"crisp\.chat",
+    r"tawk\.to",
+)
+
+
+class RequestBlockingPolicy:
+    """
+    Decides which requests a browser context may make.
+
+    Args:
+        resource_types: Iterable[str] - Playwright resource types to abort
+        url_patterns: Iterable[str] - Regexes; matching URLs are aborted
+        allow_patterns: Iterable[str] - Regexes that override both block lists
+    """
+
+    def __init__(self, resource_types: Iterable[str] = DEFAULT_BLOCKED_RESOURCE_TYPES,
+                 url_patterns: Iterable[str] = DEFAULT_BLOCKED_URL_PATTERNS,
+                 allow_patterns: Iterable[str] = ()):
+        self.resource_types = frozenset(resource_types)
+        self.url_patterns = [re.compile(p, re.IGNORECASE) for p in url_patterns]
+        self.allow_patterns = [re.compile(p, re.IGNORECASE) for p in allow_patterns]
+        self.blocked = 0
+        self.allowed = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestBlockingPolicy"]:
+        """
+        Build the policy from environment variables:
+
+            HUMANIZER_BLOCK_RESOURCES: "0" disables blocking (default "1")
+            HUMANIZER_BLOCKED_TYPES: comma-separated resource types (replaces the defaults)
+            HUMANIZER_BLOCKED_URLS: comma-separated extra URL regexes
+            HUMANIZER_ALLOWED_URLS: comma-separated URL regexes that are never blocked
+        """
+        if os.environ.get("HUMANIZER_BLOCK_RESOURCES", "1").strip().lower() in ("0", "false", "no", "off"):
+            return None
+
+        def split(name):
+            return [p.strip() for p in os.environ.get(name, "").split(",") if p.strip()]
+
+        resource_types = split("HUMANIZER_BLOCKED_TYPES") or DEFAULT_BLOCKED_RESOURCE_TYPES
+        return cls(
+            resource_types=resource_types,
+            url_patterns=list(DEFAULT_BLOCKED_URL_PATTERNS) + split("HUMANIZER_BLOCKED_URLS"),
+            allow_patterns=split("HUMANIZER_ALLOWED_URLS"),
+        )
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if any(p.search(url) for p in self.allow_patterns):
+            return False
+        if resource_type in self.resource_types:
+            return True
+        return any(p.search(url) for p in self.url_patterns)
+
+    def install(self, context):
+        """Route every request of *context* through this policy"""
+        context.route("**/*", self._handle_route)
+
+    def _handle_route(self, route):
+        request = route.request
+        try:
+            if self.should_block(request.resource_type, request.url):
+                self.blocked += 1
+                route.abort()
+            else:
+                self.allowed += 1
+                route.continue_()
+        except Exception:
+            # The page may have navigated or closed while the request was paused
+            pass
+
+
+def resolve_blocking_policy(block_resources) -> Optional[RequestBlockingPolicy]:
+    """
+    Turn the ``block_resources`` argument accepted by PlaywrightHumanizer into a policy.
+
+    None reads the environment, True/False force the default policy on/off, and a
+    RequestBlockingPolicy instance is used as is.
+    """
+    if block_resources is None:
+        return RequestBlockingPolicy.from_env()
+    if isinstance(block_resources, RequestBlockingPolicy):
+        return block_resources
+    return RequestBlockingPolicy() if block_resources else None
+
+
+def benchmark_resource_blocking(runs: int = 3, headless: bool = True) -> dict:
+    """
+    Open the humanizer page *runs* times with and without blocking and report
+    average load time and Chromium memory.
+
+    Each run loads the page in a fresh browser context (cold cache) of an
+    already running browser, and only the navigation and the wait for the
+    form to become usable are timed, not the Playwright/Chromium launch.
+
+    Returns:
+        dict: {'blocked': {...}, 'unblocked': {...}} with load_seconds,
+              renderer_mb, total_mb and js_heap_mb averages
+    """
+    from browser_metrics import chromium_memory, page_js_heap_bytes
+    from texttohuman import WEBSITE_URL, PlaywrightHumanizer, wait_for_humanizer_ready
+
+    results = {}
+    for label, policy in (("unblocked", False), ("blocked", RequestBlockingPolicy())):
+        samples = []
+        humanizer = PlaywrightHumanizer(headless=headless, block_resources=False)
+        with humanizer as launched_page:
+            browser = launched_page.context.browser
+            for _ in range(runs):
+                context = browser.new_context()
+                if policy:
+                    policy.install(context)
+                try:
+                    page = context.new_page()
+                    start = time.perf_counter()
+                    page.goto(WEBSITE_URL, wait_until='domcontentloaded')
+                    wait_for_humanizer_ready(page)
+                    load_seconds = time.perf_counter() - start
+                    memory = chromium_memory(browser_marker=humanizer.browser_marker) or {}
+                    samples.append({
+                        'load_seconds': load_seconds,
+                        'renderer_mb': memory.get('renderer', 0) / 2**20,
+                        'total_mb': memory.get('total', 0) / 2**20,
+                        'js_heap_mb': (page_js_heap_bytes(page) or 0) / 2**20,
+                    })
+                finally:
+                    context.close()
+        results[label] = {key: sum(s[key] for s in samples) / len(samples) for key in samples[0]}
+        if isinstance(policy, RequestBlockingPolicy):
+            results[label]['requests_blocked'] = policy.blocked
+            results[label]['requests_allowed'] = policy.allowed
+        log.info("Resource blocking benchmark", extra=kv(mode=label, runs=runs, **{
+            k: round(v, 2) for k, v in results[label].items()
+        }))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Request blocking policy tools")
+    parser.add_argument("--benchmark", action="store_true", help="Compare page load with and without blocking")
+    parser.add_argument("--runs", type=int, default=3, help="Page loads per mode")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        results = benchmark_resource_blocking(runs=args.runs, headless=not args.headed)
+        print(f"{'mode':<10} {'load s':>8} {'renderer MB':>12} {'total MB':>10} {'JS heap MB':>11}")
+        for mode, r in results.items():
+            print(f"{mode:<10} {r['load_seconds']:>8.2f} {r['renderer_mb']:>12.1f} "
+                  f"{r['total_mb']:>10.1f} {r['js_heap_mb']:>11.1f}")
+    else:
+        parser.print_help()
@@ -0,0 +1,120 @@
+"""
+Speed/quality presets for the humanizer engine.
+
+Every limit the engine used to hardcode (processing timeout, dialog retries,
+Playwright waits, the alternative score threshold and the pauses between
+steps) lives in HumanizerSettings. Three named presets cover the usual
+trade-offs:
+
+- fast: few dialog reloads, a looser score threshold and a 60 s budget per
+  job after which remaining marks are left unrefined, for interactive use
+- balanced: the engine's historical behaviour (default)
+- thorough: more reloads and longer waits, no refinement budget
+
+Pick one with HUMANIZER_PRESET or the ``preset`` argument of
+get_texttohuman_humanizer_final; individual HUMANIZER_* variables override
+single values on top of the preset.
+
+Presets travel between processes and machines by name, so only the preset
+name and the job's refinement deadline (a wall-clock timestamp) are passed
+along with a chunk.
+"""
+import os
+import time
+from typing import Optional
+
+from humanizer_logging import get_logger
+
+log = get_logger("presets")
+
+DEFAULT_PRESET = "balanced"
+
+
+def _env_number(name: str, default, cast=float):
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        log.warning(f"Ignoring invalid {name}={value!r}")
+        return default
+
+
+class HumanizerSettings:
+    """
+    Engine limits for one chunk.
+
+    Args:
+        processing_timeout: float - Seconds to wait for the site's first-pass output
+        max_retries: int - Alternative reloads per flagged mark
+        wait_timeout_ms: int - Timeout for Playwright waits (dialogs, output, form)
+        score_threshold: float - An alternative scoring below this is accepted
+        settle_seconds: float - Interval between output checks once output is
+            arriving (finished when two checks agree), and the pause after
+            scrolling to a mark
+        reload_pause: float - Pause after reloading alternatives or pasting
+        poll_interval: float - Seconds between output checks while the site works
+        refine_budget: float - Seconds from the start of a job after which no
+            further marks are refined (0 = unlimited)
+    """
+
+    def __init__(self, processing_timeout: float = 60, max_retries: int = 6, wait_timeout_ms: int = 30000,
+                 score_threshold: float = 15.0, settle_seconds: float = 1, reload_pause: float = 2,
+                 poll_interval: float = 2, refine_budget: float = 0):
+        self.processing_timeout = processing_timeout
+        self.max_retries = max_retries
+        self.wait_timeout_ms = wait_timeout_ms
+        self.score_threshold = score_threshold
+        self.settle_seconds = settle_seconds
+        self.reload_pause = reload_pause
+        self.poll_interval = poll_interval
+        self.refine_budget = refine_budget
+
+    def with_env_overrides(self) -> "HumanizerSettings":
+        return HumanizerSettings(
+            processing_timeout=_env_number("HUMANIZER_PROCESSING_TIMEOUT", self.processing_timeout),
+            max_retries=_env_number("HUMANIZER_DIALOG_RETRIES", self.max_retries, int),
+            wait_timeout_ms=_env_number("HUMANIZER_WAIT_TIMEOUT_MS", self.wait_timeout_ms, int),
+            score_threshold=_env_number("HUMANIZER_SCORE_THRESHOLD", self.score_threshold),
+            settle_seconds=_env_number("HUMANIZER_SETTLE_SECONDS", self.settle_seconds),
+            reload_pause=_env_number("HUMANIZER_RELOAD_PAUSE", self.reload_pause),
+            poll_interval=_env_number("HUMANIZER_POLL_INTERVAL", self.poll_interval),
+            refine_budget=_env_number("HUMANIZER_REFINE_BUDGET", self.refine_budget),
+        )
+
+
+PRESETS = {
+    "fast": HumanizerSettings(processing_timeout=45, max_retries=2, wait_timeout_ms=15000,
+                              score_threshold=25.0, settle_seconds=0.3, reload_pause=1,
+                              poll_interval=1, refine_budget=60),
+    "balanced": HumanizerSettings(),
+    "thorough": HumanizerSettings(processing_timeout=120, max_retries=10, wait_timeout_ms=45000,
+                                  reload_pause=3),
+}
+
+
+def preset_name(preset: Optional[str] = None) -> str:
+    """The preset *preset* resolves to (default: HUMANIZER_PRESET, then "balanced")"""
+    name = (preset or os.environ.get("HUMANIZER_PRESET") or DEFAULT_PRESET).strip().lower()
+    if name not in PRESETS:
+        log.warning(f"Unknown preset {name!r}, using {DEFAULT_PRESET}")
+        name = DEFAULT_PRESET
+    return name
+
+
+def get_settings(preset: Optional[str] = None) -> HumanizerSettings:
+    """
+    Return the settings for *preset* (default: HUMANIZER_PRESET, then
+    "balanced") with HUMANIZER_* overrides applied.
+    """
+    return PRESETS[preset_name(preset)].with_env_overrides()
+
+
+def refine_deadline_for(preset: Optional[str] = None) -> Optional[float]:
+    """
+    Wall-clock time at which a job starting now must stop refining marks,
+    or None when the preset has no refinement budget.
+    """
+    budget = get_settings(preset).refine_budget
+    return time.time() + budget if budget > 0 else None
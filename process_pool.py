@@ -0,0 +1,228 @@
+"""
+Multi-process execution mode: each worker process owns its own browser.
+
+Playwright's sync objects are bound to the thread that created them and the
+GIL serialises the Python-side work (DOCX handling, string processing,
+logging), so one process cannot make use of a large machine. A
+ProcessHumanizerPool starts N spawned worker processes, each with its own
+BrowserSlot, hands chunks to them over IPC, longest chunk first, and merges the
+results back in document order.
+
+The pool can be passed anywhere a page is accepted (read_docx_and_humanize,
+humanize_chunks, humanize_chunk).
+
+Optional hedging cuts tail latency. When the chunk queue has drained and a
+worker is idle, a chunk that has been running for longer than the observed
+HUMANIZER_HEDGE_PERCENTILE latency of its size class is submitted again on
+the idle worker. The first successful result wins. The other attempt is
+cancelled if it has not started; otherwise its result is ignored.
+"""
+import atexit
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from humanizer_logging import current_log_context, get_logger, kv, log_context
+from latency_stats import get_latency_stats, hedge_percentile_from_env
+from scheduler import count_words, longest_first_order
+from site_selectors import SiteChangedError
+from tracing import SpanContext, current_span, current_span_context, span
+
+log = get_logger("process_pool")
+
+_worker_slot = None
+
+
+def default_process_count() -> int:
+    """Worker processes to use: HUMANIZER_PROCESSES, or one per CPU core"""
+    try:
+        return max(1, int(os.environ["HUMANIZER_PROCESSES"]))
+    except (KeyError, ValueError):
+        return os.cpu_count() or 1
+
+
+def _init_worker(headless: bool, block_resources):
+    """Process initializer: start this worker's browser slot"""
+    global _worker_slot
+    from browser_slot import BrowserSlot
+
+    _worker_slot = BrowserSlot(headless=headless, block_resources=block_resources,
+                               name=f"proc-{os.getpid()}")
+    _worker_slot.__enter__()
+    atexit.register(_worker_slot.__exit__, None, None, None)
+
+
+def _run_chunk(index: int, text: str, context: dict, kwargs: dict, parent: Optional[SpanContext] = None):
+    """
+    Humanize one chunk inside a worker process; returns (index, result, seconds).
+    The chunk span continues the submitter's trace under *parent*.
+    """
+    started = time.monotonic()
+    with log_context(**{**context, 'chunk': index + 1, 'worker': os.getpid()}), \
+         span("chunk", parent=parent, index=index, words=count_words(text), worker=os.getpid()) as chunk_span:
+        try:
+            result = _worker_slot.humanize(text, **kwargs)
+        except SiteChangedError:
+            raise
+        except Exception as e:
+            chunk_span.record_error(e)
+            log.error(f"Error processing chunk: {e}")
+            result = None
+        chunk_span.set_attribute("success", bool(result))
+    return index, result, time.monotonic() - started
+
+
+class ProcessHumanizerPool:
+    """
+    Pool of worker processes, each driving its own browser.
+
+    Usage:
+        with ProcessHumanizerPool(processes=4) as pool:
+            results = pool.humanize_all(chunks)
+
+    Args:
+        processes: int - Worker process count (default: default_process_count())
+        headless: bool - Run the browsers without a window
+        block_resources: None | bool | RequestBlockingPolicy - See PlaywrightHumanizer
+        hedge_percentile: float - Hedge chunks running longer than this latency
+            percentile of their size class (default: HUMANIZER_HEDGE_PERCENTILE; 0 = off)
+    """
+
+    # Seconds between straggler checks while hedging is possible
+    HEDGE_POLL_INTERVAL = 1.0
+
+    def __init__(self, processes: Optional[int] = None, headless: bool = True, block_resources=None,
+                 hedge_percentile: Optional[float] = None):
+        self.processes = processes or default_process_count()
+        self.headless = headless
+        self.block_resources = block_resources
+        self.hedge_percentile = hedge_percentile_from_env() if hedge_percentile is None else hedge_percentile
+        self.executor = None
+
+    def __enter__(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.headless, self.block_resources),
+        )
+        log.info("Started process pool", extra=kv(processes=self.processes))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def humanize_all(self, texts: List[str], progress_callback: Optional[Callable] = None,
+                     **kwargs) -> List[Optional[str]]:
+        """
+        Humanize all chunks across the worker processes.
+
+        At most one chunk per worker is in flight, so a chunk's submit time is
+        its start time, which is what hedging measures against.
+
+        Returns:
+            List[Optional[str]]: Results in the order of *texts*
+
+        Raises:
+            SiteChangedError: A worker found the site's markup changed
+        """
+        context = current_log_context()
+        parent = current_span_context()
+        stats = get_latency_stats()
+        current_span().set_attributes(processes=self.processes, hedge_percentile=self.hedge_percentile)
+        # Longest chunks first so no large chunk is left running alone at the end
+        pending = deque(longest_first_order(texts))
+        attempts: Dict = {}  # future -> (chunk index, start time, is hedge)
+        running: Dict[int, list] = {}  # chunk index -> its in-flight futures
+        finished = set()
+        hedged = set()
+        results: List[Optional[str]] = [None] * len(texts)
+
+        def submit(index, is_hedge=False):
+            # A hedge gets its own attempt number so its artifacts do not overwrite the original's
+            attempt_context = {**context, 'attempt': 2} if is_hedge else context
+            future = self.executor.submit(_run_chunk, index, texts[index], attempt_context, kwargs, parent)
+            attempts[future] = (index, time.monotonic(), is_hedge)
+            running.setdefault(index, []).append(future)
+
+        while pending and len(attempts) < self.processes:
+            submit(pending.popleft())
+
+        # Stop as soon as every chunk has a result; a losing hedge attempt may still be running
+        while attempts and len(finished) < len(texts):
+            hedging = self.hedge_percentile > 0 and not pending and len(attempts) < self.processes
+            done, _ = wait(list(attempts), timeout=self.HEDGE_POLL_INTERVAL if hedging else None,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                index, _, is_hedge = attempts.pop(future)
+                running[index].remove(future)
+                elapsed = None
+                try:
+                    _, result, elapsed = future.result()
+                except SiteChangedError as e:
+                    # Every chunk would fail the same way: give up on the job
+                    log.error("Stopping the job, the site no longer matches the engine",
+                              extra=kv(chunk=index + 1, remaining_chunks=len(texts) - len(finished)))
+                    for other in attempts:
+                        other.cancel()
+                    raise
+                except Exception as e:
+                    # A worker died (e.g. its browser could not start), or this was a cancelled hedge
+                    if index not in finished:
+                        log.error(f"Worker process failed: {e}", extra=kv(chunk=index + 1))
+                    result = None
+                if index in finished:
+                    continue
+                if result is None and running[index]:
+                    # The other attempt of a hedged chunk may still succeed
+                    continue
+                if result is not None:
+                    stats.record(count_words(texts[index]), elapsed)
+                    if index in hedged:
+                        log.info("Hedged chunk finished", extra=kv(
+                            chunk=index + 1, won_by="hedge" if is_hedge else "original",
+                            seconds=round(elapsed, 1)
+                        ))
+                for other in running[index]:
+                    other.cancel()
+                finished.add(index)
+                results[index] = result
+                if progress_callback:
+                    progress_callback(index, result)
+
+            while pending and len(attempts) < self.processes:
+                submit(pending.popleft())
+            if self.hedge_percentile > 0 and not pending:
+                self._hedge_stragglers(texts, attempts, running, hedged, finished, submit)
+
+        current_span().set_attribute("hedged", len(hedged))
+        return results
+
+    def _hedge_stragglers(self, texts, attempts, running, hedged, finished, submit):
+        """Submit a second attempt of overdue chunks while workers are idle"""
+        stats = get_latency_stats()
+        now = time.monotonic()
+        overdue = []
+        for index, started, _ in attempts.values():
+            if index in hedged or index in finished or len(running[index]) > 1:
+                continue
+            threshold = stats.percentile(count_words(texts[index]), self.hedge_percentile)
+            if threshold is not None and now - started > threshold:
+                overdue.append((now - started - threshold, index, threshold))
+        for _, index, threshold in sorted(overdue, reverse=True):
+            if len(attempts) >= self.processes:
+                break
+            hedged.add(index)
+            log.info("Hedging straggler chunk on an idle worker", extra=kv(
+                chunk=index + 1, threshold=round(threshold, 1), percentile=self.hedge_percentile
+            ))
+            submit(index, is_hedge=True)
+
+    def humanize(self, text: str, **kwargs) -> Optional[str]:
+        """Humanize a single chunk on any free worker"""
+        return self.humanize_all([text], **kwargs)[0]
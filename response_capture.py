@@ -0,0 +1,93 @@
+"""
+Reading the humanizer's result from the site's own network response.
+
+By default the engine learns that a chunk is done by polling the output
+element's text until it stops changing. With HUMANIZER_CAPTURE_RESPONSE=1
+the engine instead waits for the response of the humanize request, which
+signals completion as soon as the data arrives. The output text is then
+taken from the response payload. The site may still be rendering flagged
+marks at that point, so the engine waits until the output's length, its
+mark count and the status line stop changing before refining.
+
+The request is recognized by method (POST) and by matching
+HUMANIZER_RESPONSE_PATTERN against its URL. When no such response arrives,
+or its payload has no recognizable output or only echoes the submitted
+text, the engine falls back to the DOM. A response that never arrives costs
+a full processing timeout, so after the first such miss capture stays off
+for the rest of the process.
+"""
+import json
+import os
+import re
+from typing import Optional
+
+from humanizer_logging import get_logger, kv
+
+log = get_logger("capture")
+
+DEFAULT_RESPONSE_PATTERN = r"humaniz"
+# Payload keys that may hold the output text, in order of preference
+OUTPUT_KEYS = ("humanized", "humanizedText", "output", "result", "text", "content", "data")
+
+# Set once no humanize response arrived in time (see disable_capture)
+_capture_missed = False
+
+
+def capture_enabled() -> bool:
+    """Whether HUMANIZER_CAPTURE_RESPONSE is set and no response has been missed yet"""
+    if _capture_missed:
+        return False
+    return os.environ.get("HUMANIZER_CAPTURE_RESPONSE", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def disable_capture(pattern: re.Pattern) -> None:
+    """
+    Turn capture off for the rest of the process after no response matching
+    *pattern* arrived, so later chunks poll the page right away instead of
+    each waiting out the processing timeout first.
+    """
+    global _capture_missed
+    if not _capture_missed:
+        _capture_missed = True
+        log.warning("No humanize response captured, reading the output from the page from now on; "
+                    "check HUMANIZER_RESPONSE_PATTERN", extra=kv(pattern=pattern.pattern))
+
+
+def response_pattern() -> re.Pattern:
+    """URL regex of the humanize request (HUMANIZER_RESPONSE_PATTERN)"""
+    pattern = os.environ.get("HUMANIZER_RESPONSE_PATTERN", "").strip() or DEFAULT_RESPONSE_PATTERN
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        log.warning(f"Invalid HUMANIZER_RESPONSE_PATTERN {pattern!r}, using the default: {e}")
+        return re.compile(DEFAULT_RESPONSE_PATTERN, re.IGNORECASE)
+
+
+def is_humanize_response(response, pattern: Optional[re.Pattern] = None) -> bool:
+    """Predicate for page.expect_response: the POST whose URL matches *pattern*"""
+    pattern = pattern or response_pattern()
+    return response.request.method == "POST" and bool(pattern.search(response.url))
+
+
+def _find_text(value) -> Optional[str]:
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, dict):
+        for key in OUTPUT_KEYS:
+            if key in value:
+                text = _find_text(value[key])
+                if text:
+                    return text
+    return None
+
+
+def extract_output_text(body: str) -> Optional[str]:
+    """
+    Output text from a humanize response body, or None when the body is
+    not JSON or none of OUTPUT_KEYS (searched depth-first) holds a string.
+    """
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    return _find_text(payload)
@@ -0,0 +1,326 @@
+"""
+Shared scheduler that sits in front of the humanizer workers when several
+users (Streamlit sessions) share one deployment.
+
+Two rules decide which chunk a free worker runs next:
+
+1. Fair share between sessions. Every session has a virtual time that grows
+   by the words it has been served. The session with the lowest virtual
+   time goes next. A session that becomes active starts at the current
+   virtual clock, so idle time cannot be banked. One user's 300-page
+   document therefore delays another user's paragraph by at most one chunk.
+
+2. Shortest job first, with aging, inside a session. Job cost is estimated
+   from the chunk planner's word counts. Jobs are ordered by response ratio
+   (wait + estimated time) / estimated time, so short jobs go first, but a
+   long job's ratio keeps growing while it waits and it cannot be starved.
+
+Within a job, chunks are dispatched longest-first (LPT) so that a big chunk
+does not end up running alone at the end of the document; results are
+still reassembled in document order.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from deadlines import remaining
+from humanizer_logging import current_log_context, get_logger, kv, log_context
+from site_selectors import SiteChangedError
+from tracing import current_span, span
+
+log = get_logger("scheduler")
+
+# ~2000 words/minute, the throughput quoted in the README
+DEFAULT_SECONDS_PER_WORD = 0.03
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def longest_first_order(texts: List[str], cost: Callable[[str], float] = count_words) -> List[int]:
+    """
+    Return chunk indices sorted by predicted cost, largest first (longest
+    processing time first). Ties keep document order.
+
+    Args:
+        texts: List[str] - Chunk texts
+        cost: callable(text) -> float - Predicted processing cost (default: word count)
+    """
+    costs = [cost(text) for text in texts]
+    return sorted(range(len(texts)), key=lambda i: -costs[i])
+
+
+class ScheduledJob:
+    """
+    A job's chunks and results while it is in the scheduler.
+
+    Attributes:
+        results: List[Optional[str]] - Filled in as chunks finish
+        done: threading.Event - Set when every chunk has finished
+        error: SiteChangedError - Set when a chunk found the site changed; the
+            job's remaining chunks are cancelled and humanize_all raises it
+    """
+
+    def __init__(self, job_id: str, session_id: str, texts: List[str], options: dict,
+                 progress_callback: Optional[Callable], log_fields: dict):
+        self.job_id = job_id
+        self.session_id = session_id
+        self.texts = texts
+        self.words = [count_words(t) for t in texts]
+        self.options = options
+        self.progress_callback = progress_callback
+        self.log_fields = log_fields
+        # Chunk spans run on worker threads and are started under the submitter's span
+        self.parent_span = current_span()
+        self.pending = deque(longest_first_order(texts))
+        self.remaining_words = sum(self.words)
+        self.outstanding = len(texts)
+        self.results: List[Optional[str]] = [None] * len(texts)
+        self.submitted_at = time.monotonic()
+        self.done = threading.Event()
+        self.error: Optional[SiteChangedError] = None
+        if not texts:
+            self.done.set()
+
+    def response_ratio(self, now: float, seconds_per_word: float) -> float:
+        estimate = max(self.remaining_words, 1) * seconds_per_word
+        return (now - self.submitted_at + estimate) / estimate
+
+
+class FairShareScheduler:
+    """
+    Runs chunks from many jobs on a fixed set of worker threads, each owning a browser.
+
+    Args:
+        workers: int - Worker threads (browsers)
+        slot_factory: callable(name) -> context manager yielding an object with
+            ``humanize(text, **kwargs)``; defaults to browser_slot.BrowserSlot
+        seconds_per_word: float - Cost model used for the SJF estimate
+    """
+
+    def __init__(self, workers: int = 1, slot_factory: Optional[Callable] = None,
+                 seconds_per_word: float = DEFAULT_SECONDS_PER_WORD):
+        self.workers = workers
+        self.slot_factory = slot_factory or self._default_slot_factory
+        self.seconds_per_word = seconds_per_word
+        self._jobs: Dict[str, List[ScheduledJob]] = {}
+        self._vtime: Dict[str, float] = {}
+        self._clock = 0.0
+        self._job_seq = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+
+    @staticmethod
+    def _default_slot_factory(name):
+        from browser_slot import BrowserSlot
+        return BrowserSlot(headless=True, name=name)
+
+    def start(self):
+        """Start the worker threads (called automatically by submit)"""
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, args=(f"sched-{i}",),
+                                          name=f"sched-{i}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def shutdown(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def submit(self, session_id: str, texts: List[str], progress_callback: Optional[Callable] = None,
+               **kwargs) -> ScheduledJob:
+        """
+        Queue a job's chunks. Returns at once; wait on ``job.done`` or use wait().
+        """
+        self.start()
+        with self._cond:
+            self._job_seq += 1
+            job = ScheduledJob(f"{session_id}-{self._job_seq}", session_id, texts, kwargs,
+                               progress_callback, current_log_context())
+            if not texts:
+                return job
+            if not self._jobs.get(session_id):
+                # A session that becomes active starts at the current virtual clock
+                self._vtime[session_id] = max(self._vtime.get(session_id, 0.0), self._clock)
+            self._jobs.setdefault(session_id, []).append(job)
+            log.info("Job queued", extra=kv(
+                session=session_id, sched_job=job.job_id, chunks=len(texts),
+                words=job.remaining_words, queued_jobs=sum(len(j) for j in self._jobs.values())
+            ))
+            self._cond.notify_all()
+        return job
+
+    def wait(self, job: ScheduledJob, timeout: Optional[float] = None) -> List[Optional[str]]:
+        if not job.done.wait(timeout):
+            log.error("Timed out waiting for scheduled job", extra=kv(sched_job=job.job_id))
+            self.cancel(job)
+        return job.results
+
+    def cancel(self, job: ScheduledJob):
+        """Drop the job's chunks that have not started yet"""
+        with self._cond:
+            job.outstanding -= len(job.pending)
+            job.pending.clear()
+            self._drop_if_drained(job)
+            if job.outstanding <= 0:
+                job.done.set()
+
+    def _drop_if_drained(self, job: ScheduledJob):
+        jobs = self._jobs.get(job.session_id)
+        if jobs and not job.pending and job in jobs:
+            jobs.remove(job)
+            if not jobs:
+                del self._jobs[job.session_id]
+
+    def next_task(self):
+        """
+        Pick the next (job, chunk index) by fair share, then by response ratio.
+        Must be called with the condition lock held. Returns None if nothing is queued.
+        """
+        if not self._jobs:
+            return None
+        now = time.monotonic()
+        session_id = min(self._jobs, key=lambda s: (
+            self._vtime.get(s, 0.0), min(j.remaining_words for j in self._jobs[s])
+        ))
+        job = max(self._jobs[session_id], key=lambda j: j.response_ratio(now, self.seconds_per_word))
+        index = job.pending.popleft()
+        words = job.words[index]
+        job.remaining_words -= words
+        self._clock = max(self._clock, self._vtime[session_id])
+        self._vtime[session_id] += words
+        self._drop_if_drained(job)
+        return job, index
+
+    def _finish(self, job: ScheduledJob, index: int, result: Optional[str]):
+        with self._cond:
+            job.results[index] = result
+            job.outstanding -= 1
+            finished = job.outstanding <= 0
+        if job.progress_callback:
+            try:
+                job.progress_callback(index, result)
+            except Exception as e:
+                log.warning(f"Progress callback failed: {e}")
+        if finished:
+            job.done.set()
+
+    def _worker_loop(self, name: str):
+        while not self._stopping:
+            try:
+                with self.slot_factory(name) as slot:
+                    self._serve(slot)
+                    return
+            except Exception as e:
+                log.error(f"Scheduler worker failed, restarting in 10s: {e}", extra=kv(worker=name))
+                time.sleep(10)
+
+    def _serve(self, slot):
+        while True:
+            with self._cond:
+                task = self.next_task()
+                while task is None and not self._stopping:
+                    self._cond.wait()
+                    task = self.next_task()
+                if task is None:
+                    return
+            job, index = task
+            with log_context(**{**job.log_fields, 'chunk': index + 1, 'session': job.session_id}), \
+                 span("chunk", parent=job.parent_span, index=index, words=job.words[index],
+                      worker=threading.current_thread().name) as chunk_span:
+                try:
+                    result = slot.humanize(job.texts[index], **job.options)
+                except SiteChangedError as e:
+                    # The job's other chunks would fail the same way
+                    chunk_span.record_error(e)
+                    log.error(f"Cancelling job: {e}", extra=kv(sched_job=job.job_id))
+                    job.error = e
+                    self.cancel(job)
+                    result = None
+                except Exception as e:
+                    chunk_span.record_error(e)
+                    log.error(f"Error processing chunk: {e}")
+                    result = None
+                chunk_span.set_attribute("success", bool(result))
+            self._finish(job, index, result)
+
+
+class SchedulerHumanizer:
+    """
+    Per-session handle on a shared scheduler; usable wherever a pool is accepted
+    (humanize_chunks, read_docx_and_humanize).
+
+    Args:
+        scheduler: FairShareScheduler - The shared scheduler
+        session_id: str - Fair-share key (e.g. the Streamlit session id)
+        timeout: float - Seconds to wait for a job before giving up on its remaining chunks
+    """
+
+    def __init__(self, scheduler: FairShareScheduler, session_id: str, timeout: Optional[float] = None):
+        self.scheduler = scheduler
+        self.session_id = session_id
+        self.timeout = timeout
+
+    @property
+    def workers(self) -> int:
+        """Worker threads of the shared scheduler (chunks that may run at once)"""
+        return self.scheduler.workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def humanize_all(self, texts: List[str], progress_callback: Optional[Callable] = None,
+                     **kwargs) -> List[Optional[str]]:
+        job = self.scheduler.submit(self.session_id, texts, progress_callback=progress_callback, **kwargs)
+        current_span().set_attributes(session=self.session_id, sched_job=job.job_id)
+        timeout = self.timeout
+        if kwargs.get('deadline') is not None:
+            # Chunks still queued at the job deadline are dropped rather than started
+            left = remaining(kwargs['deadline'])
+            timeout = left if timeout is None else min(timeout, left)
+        results = self.scheduler.wait(job, timeout)
+        if job.error is not None:
+            raise job.error
+        return results
+
+    def humanize(self, text: str, **kwargs) -> Optional[str]:
+        return self.humanize_all([text], **kwargs)[0]
+
+
+_shared_scheduler: Optional[FairShareScheduler] = None
+_shared_lock = threading.Lock()
+
+
+def shared_worker_count() -> int:
+    """Worker count for the shared scheduler from HUMANIZER_SHARED_WORKERS (0 = disabled)"""
+    try:
+        return max(0, int(os.environ.get("HUMANIZER_SHARED_WORKERS", "0")))
+    except ValueError:
+        return 0
+
+
+def get_shared_scheduler() -> Optional[FairShareScheduler]:
+    """
+    Process-wide scheduler used by all sessions, or None when HUMANIZER_SHARED_WORKERS is unset.
+    """
+    global _shared_scheduler
+    workers = shared_worker_count()
+    if not workers:
+        return None
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = FairShareScheduler(workers=workers)
+        return _shared_scheduler
@@ -0,0 +1,81 @@
+"""
+In-flight request coalescing ("single flight").
+
+When several threads ask for the same key at the same time, only the first
+(the leader) does the work; the others wait for it and share its result. If
+the leader fails (returns None or raises), each waiter runs the work itself,
+so coalescing never turns one failure into many. A waiter never waits past
+its own job deadline, however long the leader runs.
+
+This covers every thread of one process: Streamlit sessions, the shared
+scheduler's workers and the threads of a queue worker daemon.
+"""
+import re
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from deadlines import remaining
+from humanizer_logging import get_logger, kv
+from tracing import current_span
+
+log = get_logger("single_flight")
+
+
+def normalize_chunk(text: str) -> str:
+    """
+    Key used to recognise identical chunks: line endings unified, runs of
+    spaces/tabs collapsed and surrounding whitespace stripped on every line.
+    Line structure is kept because it shapes the humanized output.
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(re.sub(r"[ \t\u00a0]+", " ", line).strip() for line in lines).strip()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], deadline: Optional[float] = None) -> Any:
+        """
+        Run *fn* unless a call with *key* is already in flight, in which case
+        wait for that call and return its result. A waiter gives up and
+        returns None once *deadline* (the caller's job deadline) passes.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            if not call.done.wait(remaining(deadline)):
+                log.error("Chunk abandoned: job deadline passed waiting for an identical in-flight chunk")
+                return None
+            if call.result is not None:
+                current_span().set_attribute("coalesced", True)
+                log.info("Shared result of identical in-flight chunk")
+                return call.result
+            # The leader failed: do the work ourselves
+            return fn()
+
+        try:
+            call.result = fn()
+            return call.result
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                log.info("Coalesced identical chunk requests", extra=kv(waiters=call.waiters))
+            call.done.set()
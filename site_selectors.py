@@ -0,0 +1,115 @@
+"""
+Registry of every selector the engine relies on, plus a preflight probe.
+
+When the site's markup changes, a wait on a missing element only ends in a
+timeout that says nothing about the cause. preflight() checks all the
+selectors of a stage in one page.evaluate call, polling briefly while the
+page renders, and raises SiteChangedError naming exactly what is missing.
+The engine runs it after a form or dialog wait times out, so a page that is
+merely slow to hydrate is not mistaken for a changed site.
+
+Stages:
+    form    - present as soon as the page has loaded
+    output  - present once the site has produced output
+    dialog  - inside the alternatives dialog opened by clicking a mark
+"""
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from humanizer_logging import get_logger, kv
+
+log = get_logger("selectors")
+
+TEXTAREA_SELECTOR = 'textarea[data-slot="textarea"]'
+HUMANIZE_BUTTON_NAME = "Humanize Now"
+OUTPUT_SELECTOR = 'div.p-4.overflow-y-auto.rounded-lg.h-full.text-foreground.bg-background'
+STATUS_SELECTOR = 'div.flex.items-center.gap-4.text-xs.text-primary'
+MARK_SELECTOR = 'mark'
+DIALOG_SELECTOR = 'div[role="dialog"]'
+# Relative to the dialog
+ALTERNATIVES_SELECTOR = 'div.space-y-2'
+RELOAD_CONTAINER_SELECTOR = 'div.flex.justify-end'
+ALTERNATIVE_META_SELECTOR = 'div.flex.items-center.gap-2.text-xs'
+ALTERNATIVE_TEXT_SELECTOR = 'p.text-sm.text-foreground.flex-1'
+
+STAGE_FORM = "form"
+STAGE_OUTPUT = "output"
+STAGE_DIALOG = "dialog"
+
+# Element all selectors of a stage are looked up in (None = the document)
+STAGE_ROOTS = {STAGE_FORM: None, STAGE_OUTPUT: None, STAGE_DIALOG: DIALOG_SELECTOR}
+
+# Seconds preflight() keeps polling for missing elements by default
+PREFLIGHT_TIMEOUT = max(0.0, float(os.environ.get("HUMANIZER_PREFLIGHT_TIMEOUT", "10")))
+
+
+class SiteSelector(NamedTuple):
+    name: str
+    selector: str
+    stage: str
+    text: Optional[str] = None  # also require this exact text content
+
+
+REGISTRY: List[SiteSelector] = [
+    SiteSelector("textarea", TEXTAREA_SELECTOR, STAGE_FORM),
+    SiteSelector("humanize_button", "button", STAGE_FORM, text=HUMANIZE_BUTTON_NAME),
+    SiteSelector("output", OUTPUT_SELECTOR, STAGE_OUTPUT),
+    SiteSelector("alternatives", ALTERNATIVES_SELECTOR, STAGE_DIALOG),
+    SiteSelector("reload_button", f"{RELOAD_CONTAINER_SELECTOR} button", STAGE_DIALOG),
+]
+
+_PROBE_SCRIPT = """([root, entries]) => {
+    const scope = root ? document.querySelector(root) : document;
+    const found = {};
+    for (const entry of entries) {
+        if (!scope) { found[entry.name] = false; continue; }
+        const elements = Array.from(scope.querySelectorAll(entry.selector));
+        found[entry.name] = entry.text
+            ? elements.some(el => (el.textContent || '').trim() === entry.text)
+            : elements.length > 0;
+    }
+    return found;
+}"""
+
+
+class SiteChangedError(RuntimeError):
+    """The site no longer has elements the engine depends on"""
+
+    def __init__(self, stage: str, missing: List[SiteSelector]):
+        self.stage = stage
+        self.missing = missing
+        details = ", ".join(f"{entry.name} ({entry.selector!r})" for entry in missing)
+        super().__init__(f"Site markup changed: {stage} elements not found: {details}")
+
+    def __reduce__(self):
+        # Keep the error picklable so it crosses the process pool intact
+        return (SiteChangedError, (self.stage, self.missing))
+
+
+def probe(page, stage: str = STAGE_FORM) -> Dict[str, bool]:
+    """Check every registered selector of *stage* in one evaluate call"""
+    entries = [entry._asdict() for entry in REGISTRY if entry.stage == stage]
+    return page.evaluate(_PROBE_SCRIPT, [STAGE_ROOTS.get(stage), entries])
+
+
+def preflight(page, stage: str = STAGE_FORM, timeout: float = PREFLIGHT_TIMEOUT, poll_interval: float = 0.5):
+    """
+    Probe *stage* until every element is present or *timeout* seconds pass.
+
+    Raises:
+        SiteChangedError: Naming the elements that never appeared
+    """
+    give_up = time.monotonic() + timeout
+    while True:
+        found = probe(page, stage)
+        if all(found.values()):
+            return
+        if time.monotonic() >= give_up:
+            break
+        # Not time.sleep: route handlers only run while Playwright is called
+        page.wait_for_timeout(poll_interval * 1000)
+    missing = [entry for entry in REGISTRY if entry.stage == stage and not found.get(entry.name)]
+    error = SiteChangedError(stage, missing)
+    log.error(str(error), extra=kv(stage=stage, url=page.url))
+    raise error
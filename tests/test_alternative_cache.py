@@ -0,0 +1,18 @@
+from alternative_cache import AlternativeCache
+
+
+def test_hit_requires_score_below_threshold(tmp_path):
+    cache = AlternativeCache(str(tmp_path / "alternatives.db"))
+    # Accepted under a lenient preset (threshold 25)
+    cache.put("A flagged  sentence.", "A rewritten sentence.", 20.0)
+
+    assert cache.get("A flagged sentence.", max_score=25.0) == "A rewritten sentence."
+    assert cache.get("A flagged sentence.", max_score=15.0) is None
+
+
+def test_entry_without_score_never_meets_a_threshold(tmp_path):
+    cache = AlternativeCache(str(tmp_path / "alternatives.db"))
+    cache.put("Sentence.", "Rewrite.")
+
+    assert cache.get("Sentence.", max_score=15.0) is None
+    assert cache.get("Sentence.") == "Rewrite."
@@ -0,0 +1,57 @@
+from bisection import bisect_failed_chunk, max_bisect_failures, split_in_half
+
+
+def make_chunk(paragraphs, words_per_paragraph, bad=None):
+    text = []
+    for number in range(paragraphs):
+        word = "bad" if number == bad else f"p{number}"
+        text.append(" ".join([word] * words_per_paragraph))
+    return "\n\n".join(text)
+
+
+def test_split_in_half_at_paragraph_boundary():
+    left, separator, right = split_in_half("one two\n\nthree four\n\nfive six seven eight")
+
+    assert left == "one two\n\nthree four"
+    assert separator == "\n\n"
+    assert right == "five six seven eight"
+
+
+def test_one_bad_paragraph_in_a_long_chunk_is_kept_and_the_rest_humanized():
+    # 3000 words, one paragraph that the site always fails on
+    chunk = make_chunk(60, 50, bad=37)
+    calls = []
+
+    def run(piece):
+        calls.append(len(piece.split()))
+        return None if "bad" in piece else piece.upper()
+
+    result = bisect_failed_chunk(chunk, run, min_words=150)
+
+    assert result is not None
+    # One failed piece per level of splitting (1500, 750, 400 and 200 words)
+    # used to exhaust a fixed limit of four failures
+    assert calls == [1500, 1500, 750, 350, 400, 200, 200, 750]
+    paragraphs = result.split("\n\n")
+    assert len(paragraphs) == 60
+    assert paragraphs[37] == " ".join(["bad"] * 50)
+    # Only the smallest piece around the bad paragraph keeps its wording
+    kept = [number for number, paragraph in enumerate(paragraphs) if not paragraph.isupper()]
+    assert 37 in kept
+    assert len(kept) * 50 < 2 * 150
+
+
+def test_gives_up_when_every_piece_fails():
+    chunk = make_chunk(60, 50)
+    calls = []
+
+    def run(piece):
+        calls.append(piece)
+        return None
+
+    assert bisect_failed_chunk(chunk, run, min_words=150) is None
+    assert len(calls) == max_bisect_failures(3000, 150)
+
+
+def test_small_chunks_are_not_bisected():
+    assert bisect_failed_chunk(make_chunk(4, 50), lambda piece: piece, min_words=150) is None
@@ -0,0 +1,19 @@
+import browser_metrics
+from browser_metrics import BROWSER_MARKER_PREFIX, count_marked_browsers
+
+
+def fake_process(proc_dir, pid, *args):
+    process_dir = proc_dir / str(pid)
+    process_dir.mkdir()
+    (process_dir / "cmdline").write_bytes("\0".join(args).encode() + b"\0")
+
+
+def test_counts_marked_browser_processes_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(browser_metrics, "PROC_DIR", str(tmp_path))
+    fake_process(tmp_path, 10, "chrome", f"{BROWSER_MARKER_PREFIX}aaa")
+    fake_process(tmp_path, 11, "chrome", "--type=renderer", f"{BROWSER_MARKER_PREFIX}aaa")
+    fake_process(tmp_path, 20, "chrome", f"{BROWSER_MARKER_PREFIX}bbb")
+    fake_process(tmp_path, 30, "chrome", "--no-sandbox")
+    (tmp_path / "self").mkdir()
+
+    assert count_marked_browsers() == 2
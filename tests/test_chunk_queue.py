@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from chunk_queue import (
+    STATUS_DONE, STATUS_FAILED, STATUS_SITE_CHANGED, QueueHumanizerPool, RedisChunkQueue, SQLiteChunkQueue,
+    site_changed_result,
+)
+from site_selectors import REGISTRY, STAGE_FORM, SiteChangedError
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_queue(request, tmp_path):
+    """Factory for a fresh queue of each backend; all queues of a test share the store"""
+    if request.param == "sqlite":
+        path = str(tmp_path / "queue.db")
+        return lambda **kwargs: SQLiteChunkQueue(path, poll_interval=0.01, **kwargs)
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    return lambda **kwargs: RedisChunkQueue(client=fakeredis.FakeRedis(server=server), poll_interval=0.01, **kwargs)
+
+
+def drain(queue, worker="w"):
+    tasks = []
+    while True:
+        task = queue.claim(worker, timeout=0)
+        if task is None:
+            return tasks
+        tasks.append(task)
+
+
+def test_chunks_are_claimed_in_order_and_results_collected(make_queue):
+    queue = make_queue()
+    queue.submit("job", ["a", "bb", "ccc"], {"preset": "fast"}, order=[2, 0, 1])
+
+    tasks = drain(queue)
+    assert [task.index for task in tasks] == [2, 0, 1]
+    assert tasks[0].text == "ccc" and tasks[0].options == {"preset": "fast"} and tasks[0].attempts == 1
+
+    queue.complete(tasks[0], "CCC")
+    queue.complete(tasks[1], None)
+    assert queue.results("job") == {2: (STATUS_DONE, "CCC"), 0: (STATUS_FAILED, None)}
+
+
+def test_deleted_job_is_not_handed_out_or_resurrected(make_queue):
+    queue = make_queue()
+    queue.submit("abandoned", ["a", "b", "c"])
+    queue.submit("other", ["x"])
+    running = queue.claim("w", timeout=0)
+
+    queue.delete_job("abandoned")
+    # The worker that was running a chunk of the deleted job finishes it
+    queue.complete(running, "A")
+
+    assert [task.job_id for task in drain(queue)] == ["other"]
+    assert queue.results("abandoned") == {}
+
+
+def test_expired_lease_is_handed_to_another_worker(make_queue):
+    queue = make_queue(lease_seconds=0.05)
+    queue.submit("job", ["a"])
+    first = queue.claim("dead-worker", timeout=0)
+    assert queue.claim("w2", timeout=0) is None
+
+    time.sleep(0.1)
+    second = queue.claim("w2", timeout=0)
+    assert second is not None and second.index == first.index and second.attempts == 2
+
+
+def test_chunk_fails_after_max_attempts(make_queue):
+    queue = make_queue(lease_seconds=0.05, max_attempts=1)
+    queue.submit("job", ["a"])
+    assert queue.claim("dead-worker", timeout=0) is not None
+
+    time.sleep(0.1)
+    assert queue.claim("w2", timeout=0) is None
+    assert queue.results("job") == {0: (STATUS_FAILED, None)}
+
+
+def test_redis_claim_leases_task_before_it_can_be_requeued():
+    fakeredis = pytest.importorskip("fakeredis")
+    queue = RedisChunkQueue(client=fakeredis.FakeRedis(), lease_seconds=60)
+    queue.submit("job", ["a"])
+    task = queue.claim("w1", timeout=0)
+
+    lease = float(queue.client.hget(queue._key("task", task.task_id), "lease_until"))
+    assert lease > time.time()
+    queue.requeue_expired()
+    assert queue.claim("w2", timeout=0) is None
+
+
+def test_site_changed_result_stops_the_submitting_job(make_queue):
+    queue = make_queue()
+    pool = QueueHumanizerPool(queue, timeout=5, poll_interval=0.01)
+    error = SiteChangedError(STAGE_FORM, [REGISTRY[0]])
+
+    def worker():
+        task = queue.claim("w", timeout=5)
+        queue.complete(task, site_changed_result(error), status=STATUS_SITE_CHANGED)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    with pytest.raises(SiteChangedError) as raised:
+        pool.humanize_all(["a"])
+    thread.join(5)
+
+    assert raised.value.stage == STAGE_FORM
+    assert raised.value.missing == [REGISTRY[0]]
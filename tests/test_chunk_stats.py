@@ -0,0 +1,48 @@
+import pytest
+
+from chunk_stats import (
+    ChunkStatsStore, LatencyModel, get_stats_store, recommend_chunk_size, recommended_chunk_size,
+)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("HUMANIZER_STATS_DB", str(tmp_path / "chunk_stats.db"))
+    monkeypatch.delenv("HUMANIZER_PRESET", raising=False)
+    return get_stats_store()
+
+
+def record(store, preset, seconds_per_word, count=20):
+    for i in range(count):
+        words = 500 + 125 * i
+        first_pass = seconds_per_word * words
+        store.record(words, 10, first_pass, first_pass + 20, True, preset)
+
+
+def test_recent_filters_by_preset(tmp_path):
+    store = ChunkStatsStore(str(tmp_path / "chunk_stats.db"))
+    store.record(100, 1, 1.0, 2.0, True, "fast")
+    store.record(200, 2, 2.0, 4.0, True, "thorough")
+
+    assert [row[0] for row in store.recent(preset="fast")] == [100]
+    assert [row[0] for row in store.recent()] == [200, 100]
+
+
+def test_recommendation_uses_the_presets_own_history(store):
+    # Balanced chunks finish well inside the 60 s timeout at any size
+    record(store, "balanced", 0.015)
+    # Thorough chunks are much slower, but have a 120 s timeout of their own
+    record(store, "thorough", 0.06)
+
+    assert recommended_chunk_size("balanced") == 3000
+    # 2000 words take 120 s, right at the thorough timeout
+    assert recommended_chunk_size("thorough") == 2000
+    # Fitted together, the slow rows would have pulled the balanced size down
+    assert recommend_chunk_size(LatencyModel(store.recent()), 60) < 3000
+
+
+def test_recommendation_falls_back_to_all_presets_while_history_is_short(store):
+    record(store, "balanced", 0.015)
+    record(store, "fast", 0.015, count=3)
+
+    assert recommended_chunk_size("fast") == recommend_chunk_size(LatencyModel(store.recent()), 45)
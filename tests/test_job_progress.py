@@ -0,0 +1,36 @@
+import threading
+
+from job_progress import JobProgress, driver_concurrency
+
+
+class FakeDriver:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+def test_driver_concurrency_counts_processes_or_workers():
+    assert driver_concurrency(FakeDriver(processes=3)) == 3
+    assert driver_concurrency(FakeDriver(workers=4)) == 4
+    assert driver_concurrency(FakeDriver()) == 1
+
+
+def test_chunk_done_from_many_threads(monkeypatch):
+    # No recorded history: plan with the default words per second
+    monkeypatch.setenv("HUMANIZER_STATS_DB", "off")
+    progress = JobProgress([10] * 400, concurrency=8)
+    threads = [
+        threading.Thread(target=lambda start=start: [
+            progress.chunk_done(index, None if index % 10 == 0 else "text")
+            for index in range(start, 400, 8)
+        ])
+        for start in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert progress.done_chunks == 400
+    assert progress.failed == 40
+    assert progress.fraction == 1.0
+    assert progress.eta_seconds == 0.0
@@ -0,0 +1,20 @@
+import response_capture
+from response_capture import capture_enabled, disable_capture, response_pattern
+
+
+def test_capture_stays_off_after_a_missed_response(monkeypatch):
+    monkeypatch.setenv("HUMANIZER_CAPTURE_RESPONSE", "1")
+    monkeypatch.setattr(response_capture, "_capture_missed", False)
+    assert capture_enabled()
+
+    disable_capture(response_pattern())
+    assert not capture_enabled()
+    # A second miss changes nothing
+    disable_capture(response_pattern())
+    assert not capture_enabled()
+
+
+def test_capture_off_by_default(monkeypatch):
+    monkeypatch.delenv("HUMANIZER_CAPTURE_RESPONSE", raising=False)
+    monkeypatch.setattr(response_capture, "_capture_missed", False)
+    assert not capture_enabled()
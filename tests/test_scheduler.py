@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from scheduler import FairShareScheduler, SchedulerHumanizer
+from site_selectors import REGISTRY, STAGE_FORM, SiteChangedError
+
+
+class RecordingSlot:
+    """Slot that records the chunks it serves; the first chunk waits for *release*"""
+
+    def __init__(self, served, release):
+        self.served = served
+        self.release = release
+        self.started = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def humanize(self, text, **kwargs):
+        if not self.served:
+            self.started.set()
+            self.release.wait(5)
+        self.served.append(text)
+        return text.upper()
+
+
+def test_small_job_is_served_between_another_sessions_big_chunks():
+    served = []
+    release = threading.Event()
+    slot = RecordingSlot(served, release)
+    scheduler = FairShareScheduler(workers=1, slot_factory=lambda name: slot)
+    big = [" ".join([f"big{i}"] * 1000) for i in range(3)]
+    try:
+        big_job = scheduler.submit("alice", big)
+        # Alice's first chunk is running when Bob's paragraph arrives
+        assert slot.started.wait(5)
+        small_job = scheduler.submit("bob", ["short paragraph"])
+        release.set()
+
+        assert scheduler.wait(small_job, 5) == ["SHORT PARAGRAPH"]
+        assert scheduler.wait(big_job, 5) == [text.upper() for text in big]
+    finally:
+        scheduler.shutdown()
+
+    assert served == [big[0], "short paragraph", big[1], big[2]]
+
+
+def test_chunks_of_a_job_run_longest_first():
+    served = []
+    release = threading.Event()
+    release.set()
+    scheduler = FairShareScheduler(workers=1, slot_factory=lambda name: RecordingSlot(served, release))
+    texts = ["a b", "a b c d e", "a"]
+    try:
+        assert scheduler.wait(scheduler.submit("alice", texts), 5) == ["A B", "A B C D E", "A"]
+    finally:
+        scheduler.shutdown()
+
+    assert served == ["a b c d e", "a b", "a"]
+
+
+class BrokenSiteSlot(RecordingSlot):
+    def humanize(self, text, **kwargs):
+        raise SiteChangedError(STAGE_FORM, [REGISTRY[0]])
+
+
+def test_site_changed_error_reaches_the_submitter():
+    scheduler = FairShareScheduler(workers=1, slot_factory=lambda name: BrokenSiteSlot([], threading.Event()))
+    try:
+        with pytest.raises(SiteChangedError):
+            SchedulerHumanizer(scheduler, "alice", timeout=5).humanize_all(["a", "b", "c"])
+    finally:
+        scheduler.shutdown()
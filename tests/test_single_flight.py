@@ -0,0 +1,87 @@
+import threading
+import time
+
+from single_flight import SingleFlight, normalize_chunk
+
+
+def run_leader_and_waiter(flight, leader_result):
+    """Start a leader that blocks until a waiter has joined, then finishes with *leader_result*"""
+    waiter_joined = threading.Event()
+    calls = []
+    results = {}
+
+    def leader_fn():
+        calls.append("leader")
+        waiter_joined.wait(5)
+        if isinstance(leader_result, Exception):
+            raise leader_result
+        return leader_result
+
+    def waiter_fn():
+        calls.append("waiter")
+        return "waiter result"
+
+    def lead():
+        try:
+            results["leader"] = flight.do("key", leader_fn)
+        except Exception as e:
+            results["leader"] = e
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    while "leader" not in calls:
+        time.sleep(0.01)
+    waiter = threading.Thread(target=lambda: results.update(waiter=flight.do("key", waiter_fn)))
+    waiter.start()
+    while flight._calls["key"].waiters == 0:
+        time.sleep(0.01)
+    waiter_joined.set()
+    leader.join(5)
+    waiter.join(5)
+    return calls, results
+
+
+def test_waiter_shares_the_leaders_result():
+    calls, results = run_leader_and_waiter(SingleFlight(), "shared result")
+
+    assert calls == ["leader"]
+    assert results == {"leader": "shared result", "waiter": "shared result"}
+
+
+def test_waiter_runs_itself_when_the_leader_returns_none():
+    calls, results = run_leader_and_waiter(SingleFlight(), None)
+
+    assert calls == ["leader", "waiter"]
+    assert results == {"leader": None, "waiter": "waiter result"}
+
+
+def test_waiter_runs_itself_when_the_leader_raises():
+    error = RuntimeError("site down")
+    calls, results = run_leader_and_waiter(SingleFlight(), error)
+
+    assert calls == ["leader", "waiter"]
+    assert results == {"leader": error, "waiter": "waiter result"}
+
+
+def test_normalize_chunk_keeps_line_structure():
+    assert normalize_chunk(" One  line.\r\nTwo\t lines. ") == "One line.\nTwo lines."
+    assert normalize_chunk("One line.\nTwo lines.") != normalize_chunk("One line. Two lines.")
+
+
+def test_waiter_gives_up_at_its_own_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("key", lambda: release.wait(5) and "late"))
+    leader.start()
+    while "key" not in flight._calls:
+        time.sleep(0.01)
+    try:
+        started = time.monotonic()
+        result = flight.do("key", lambda: "waiter result", deadline=time.time() + 0.2)
+        waited = time.monotonic() - started
+    finally:
+        release.set()
+        leader.join(5)
+
+    assert result is None
+    assert waited < 2
@@ -0,0 +1,54 @@
+from text_chunks import dedupe_blocks, plan_docx_chunks, split_unfinished_tail
+
+
+def test_dedupe_groups_repeats_by_first_appearance():
+    blocks = ["Disclaimer.", "Intro text.", "Disclaimer. ", "Body text.", "disclaimer.", "Intro  text."]
+
+    assert dedupe_blocks(blocks) == [[0, 2], [1, 5], [3], [4]]
+
+
+def test_plan_maps_every_result_back_to_the_original_positions():
+    blocks = ["Header row", "one two three", "Header row", "four five six", "Header row"]
+
+    chunks = plan_docx_chunks(blocks, chunk_size=5)
+
+    assert [chunk['indices'] for chunk in chunks] == [[0, 1], [3]]
+    assert [chunk['occurrences'] for chunk in chunks] == [[[0, 2, 4], [1]], [[3]]]
+    assert chunks[0]['text'] == "Header row\n\none two three"
+    # Every block is written back exactly once
+    written = sorted(i for chunk in chunks for group in chunk['occurrences'] for i in group)
+    assert written == list(range(len(blocks)))
+
+
+def test_plan_without_dedupe_sends_every_block():
+    blocks = ["Same.", "Same."]
+
+    chunks = plan_docx_chunks(blocks, chunk_size=100, dedupe=False)
+
+    assert chunks == [{'text': "Same.\n\nSame.", 'indices': [0, 1], 'words': 2,
+                       'occurrences': [[0], [1]]}]
+
+
+SOURCE = "First paragraph.\n\nSecond paragraph.\nThird paragraph, long.\n\nFourth paragraph."
+
+
+def test_tail_starts_after_the_last_finished_paragraph():
+    # The site stopped mid-sentence in the third paragraph
+    partial = "First rewritten.\n\nSecond rewritten.\n\nThird rewri"
+
+    finished, separator, tail = split_unfinished_tail(SOURCE, partial)
+
+    assert finished == "First rewritten.\n\nSecond rewritten."
+    assert separator == "\n"
+    assert tail == "Third paragraph, long.\n\nFourth paragraph."
+
+
+def test_nothing_to_salvage_without_a_finished_paragraph():
+    assert split_unfinished_tail(SOURCE, "First rewri") is None
+    assert split_unfinished_tail(SOURCE, "\n\nFirst rewri") is None
+
+
+def test_nothing_to_salvage_when_every_paragraph_finished():
+    partial = "One.\n\nTwo.\n\nThree.\n\nFour.\n\nExtra"
+
+    assert split_unfinished_tail(SOURCE, partial) is None
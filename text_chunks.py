@@ -0,0 +1,124 @@
+"""
+Planning the chunks of a DOCX job, and lining up cut-off output with its input.
+
+The blocks of a document (paragraphs and table cells) are grouped into
+chunks of about chunk_size words for the site. Repeated blocks such as
+disclaimers, captions and table headers are sent once, and their result
+is written back to every position they occur at.
+
+When the site times out midway through a chunk, split_unfinished_tail()
+finds the input paragraphs that have no finished output yet, so only
+those are submitted again.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from single_flight import normalize_chunk
+
+
+def dedupe_blocks(block_texts: List[str]) -> List[List[int]]:
+    """
+    Group identical blocks (after whitespace normalization) so repeated
+    disclaimers, captions and table headers are humanized only once.
+
+    Args:
+        block_texts: List[str] - Text of each block, in document order
+
+    Returns:
+        List[List[int]]: For each unique block, in order of first appearance,
+        the indices of all its occurrences
+    """
+    groups = {}
+    for i, text in enumerate(block_texts):
+        groups.setdefault(normalize_chunk(text), []).append(i)
+    return list(groups.values())
+
+
+def plan_docx_chunks(block_texts: List[str], chunk_size: int = 2000, dedupe: bool = True) -> List[dict]:
+    """
+    Group DOCX text blocks into chunks for the web service, keeping track of
+    the original block indices.
+
+    Args:
+        block_texts: List[str] - Text of each block, in document order
+        chunk_size: int - Target number of words per chunk
+        dedupe: bool - Send repeated blocks only once (see dedupe_blocks)
+
+    Returns:
+        List[dict]: {'text': str, 'indices': List[int], 'occurrences': List[List[int]],
+        'words': int} per chunk. 'indices' holds the block sent for each paragraph
+        of the chunk, 'occurrences' every block that receives its result.
+    """
+    if dedupe:
+        occurrences = dedupe_blocks(block_texts)
+    else:
+        occurrences = [[i] for i in range(len(block_texts))]
+
+    chunks = []
+    current_chunk_text = ""
+    current_chunk_indices = []
+    current_word_count = 0
+
+    for group in occurrences:
+        i = group[0]
+        text = block_texts[i]
+        # Estimate word count (simple split)
+        text_word_count = len(text.split())
+
+        if current_word_count + text_word_count > chunk_size and current_chunk_text:
+            chunks.append({
+                'text': current_chunk_text.strip(),
+                'indices': current_chunk_indices,
+                'words': current_word_count
+            })
+            current_chunk_text = text + "\n\n"
+            current_chunk_indices = [i]
+            current_word_count = text_word_count
+        else:
+            current_chunk_text += text + "\n\n"
+            current_chunk_indices.append(i)
+            current_word_count += text_word_count
+
+    if current_chunk_text.strip():
+        chunks.append({
+            'text': current_chunk_text.strip(),
+            'indices': current_chunk_indices,
+            'words': current_word_count
+        })
+
+    occurrences_by_first = {group[0]: group for group in occurrences}
+    for chunk in chunks:
+        chunk['occurrences'] = [occurrences_by_first[i] for i in chunk['indices']]
+
+    return chunks
+
+
+def split_unfinished_tail(source_text: str, partial_output: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Line up a cut-off output with its input, paragraph by paragraph.
+
+    Every output paragraph except the last (which may have been cut off
+    mid-sentence) counts as finished; the input paragraphs after those are
+    the unfinished tail.
+
+    Args:
+        source_text: str - Text that was submitted
+        partial_output: str - Output captured before the site finished
+
+    Returns:
+        Tuple[str, str, str]: (finished output, separator to put before the tail's
+        output, unfinished input), or None when nothing can be salvaged
+    """
+    source_parts = re.split(r'(\s*\n\s*)', source_text.strip())
+    paragraphs = source_parts[0::2]
+    separators = source_parts[1::2]
+
+    output = partial_output.strip()
+    last_break = output.rfind('\n')
+    if last_break < 0:
+        return None
+    finished_output = output[:last_break].rstrip()
+    done = len([line for line in finished_output.split('\n') if line.strip()])
+    if done == 0 or done >= len(paragraphs):
+        return None
+    return finished_output, separators[done - 1], ''.join(source_parts[2 * done:])
@@ -1,4 +1,5 @@
 import asyncio
+import logging
 import sys
 import time
 from io import BytesIO
@@ -10,10 +11,29 @@ from docx.table import Table, _Cell
 from docx.shared import Cm
 import os
 import re
+import uuid
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
 from typing import Optional, Tuple, List, Union
-import pyperclip
+from tracing import span, current_span
+from humanizer_logging import get_logger, kv, log_context, new_job_id
+from artifacts import artifact_piece, artifacts_enabled, save_chunk_artifacts
+from browser_metrics import BROWSER_MARKER_PREFIX
+from bisection import bisect_failed_chunk
+from text_chunks import dedupe_blocks, plan_docx_chunks, split_unfinished_tail
+from network_policy import resolve_blocking_policy
+from single_flight import SingleFlight, normalize_chunk
+from presets import HumanizerSettings, get_settings, preset_name, refine_deadline_for
+from chunk_stats import record_chunk
+from job_progress import JobProgress, driver_concurrency
+from deadlines import DeadlineExceeded, check_deadline, deadline_passed, earliest, job_deadline, pause, remaining, wait_ms
+from alternative_cache import get_alternative_cache
+from response_capture import capture_enabled, disable_capture, extract_output_text, is_humanize_response, response_pattern
+from site_selectors import (
+    ALTERNATIVE_META_SELECTOR, ALTERNATIVE_TEXT_SELECTOR, ALTERNATIVES_SELECTOR, DIALOG_SELECTOR,
+    HUMANIZE_BUTTON_NAME, MARK_SELECTOR, OUTPUT_SELECTOR, RELOAD_CONTAINER_SELECTOR,
+    STAGE_DIALOG, STAGE_FORM, STATUS_SELECTOR, TEXTAREA_SELECTOR, SiteChangedError, preflight,
+)
 
 LIST_OF_USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -29,17 +49,95 @@ if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
 WEBSITE_URL = "https://texttohuman.com"
-# Thread-safe print lock
-print_lock = Lock()
+log = get_logger("engine")
+
+COALESCE_REQUESTS = os.environ.get("HUMANIZER_COALESCE", "1").strip().lower() not in ("0", "false", "no", "off")
+# Times a timed-out chunk's unfinished tail is resubmitted
+MAX_SALVAGE_DEPTH = 2
+# Drafted chunk tabs that may wait for mark refinement in two-phase mode
+REFINE_PAGES = max(1, int(os.environ.get("HUMANIZER_REFINE_PAGES", "4")))
+_inflight_chunks = SingleFlight()
 
 def thread_safe_print(*args, **kwargs):
-    """Thread-safe print function"""
-    with print_lock:
-        print(*args, **kwargs)
+    """Kept for compatibility: forwards to the queue-backed logger instead of locking stdout"""
+    log.info(" ".join(str(arg) for arg in args))
 
 def get_random_user_agent():
     return random.choice(LIST_OF_USER_AGENTS)
 
+def wait_for_humanizer_ready(page, timeout=30000, deadline=None):
+    """
+    Wait until the humanizer form is usable: the textarea is visible and editable
+    and the Humanize button is rendered. Unlike 'networkidle' this does not wait
+    for analytics or long-polling requests to go quiet.
+    
+    Args:
+        page: Page - Playwright page instance
+        timeout: int - Timeout in milliseconds for each check
+        deadline: float - Job deadline (see deadlines.py) capping every check
+    """
+    page.wait_for_load_state('domcontentloaded', timeout=wait_ms(deadline, timeout, "page load"))
+    page.locator(TEXTAREA_SELECTOR).first.wait_for(state='visible', timeout=wait_ms(deadline, timeout, "textarea"))
+    page.wait_for_function(
+        """selector => {
+            const textarea = document.querySelector(selector);
+            return !!textarea && !textarea.disabled && !textarea.readOnly;
+        }""",
+        arg=TEXTAREA_SELECTOR,
+        timeout=wait_ms(deadline, timeout, "editable textarea")
+    )
+    page.get_by_role("button", name=HUMANIZE_BUTTON_NAME).wait_for(
+        state='visible', timeout=wait_ms(deadline, timeout, "Humanize button")
+    )
+
+def _wait_for_form(page, timeout=30000, deadline=None):
+    """
+    wait_for_humanizer_ready, telling a slow page from a changed one: only
+    when the wait times out is the form probed, and a missing element
+    raises SiteChangedError (which stops the job) instead of the timeout.
+    """
+    try:
+        wait_for_humanizer_ready(page, timeout=timeout, deadline=deadline)
+    except PlaywrightTimeout:
+        preflight(page, STAGE_FORM, timeout=0)
+        raise
+
+# Sets the value through the native setter so React's value tracker sees the
+# change, then fires the events the site's form listens to
+_SET_TEXTAREA_SCRIPT = """([selector, text]) => {
+    const textarea = document.querySelector(selector);
+    if (!textarea) return false;
+    const setValue = Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, 'value').set;
+    textarea.focus();
+    setValue.call(textarea, text);
+    textarea.dispatchEvent(new Event('input', { bubbles: true }));
+    textarea.dispatchEvent(new Event('change', { bubbles: true }));
+    return true;
+}"""
+
+def set_textarea_text(page, text, selector=TEXTAREA_SELECTOR):
+    """
+    Put *text* into the form's textarea in one page.evaluate call.
+    
+    Unlike typing this takes the same time for any chunk size, and unlike
+    the site's paste button it does not go through the system clipboard,
+    which parallel workers would share (and headless containers lack).
+    
+    Args:
+        page: Page - Playwright page instance
+        text: str - Text to enter
+        selector: str - CSS selector of the textarea
+        
+    Raises:
+        Exception: If the textarea does not hold *text* afterwards
+    """
+    if not page.evaluate(_SET_TEXTAREA_SCRIPT, [selector, text]):
+        raise Exception("Textarea not found")
+    # Browsers normalise line endings in textarea values
+    entered = page.locator(selector).first.input_value()
+    if entered.replace('\r\n', '\n') != text.replace('\r\n', '\n'):
+        raise Exception(f"Text input verification failed: {len(entered)} of {len(text)} characters entered")
+
 def iter_block_items(parent):
     """
     Yield each paragraph and table child within *parent*, in document order.
@@ -94,126 +192,138 @@ def replace_text_in_paragraph(paragraph: Paragraph, new_text: str):
         
     first_run.text = new_text
 
-def read_docx_and_humanize(file_path: str, page, chunk_size: int = 2000) -> Optional[BytesIO]:
+def read_docx_and_humanize(file_path: str, page, chunk_size: int = 2000,
+                           preset: Optional[str] = None, job_timeout: Optional[float] = None,
+                           progress_callback=None) -> Optional[BytesIO]:
     """
     Reads a DOCX, humanizes the text content element by element, and returns 
     the modified DOCX as a BytesIO object.
+    
+    *page* may be a Playwright page, a BrowserSlot or a pool (see humanize_chunks).
+    *preset* selects the speed/quality settings (see presets.py); its
+    refinement budget applies to the whole document. *job_timeout* (seconds,
+    default HUMANIZER_JOB_TIMEOUT) bounds the whole job: chunks still
+    unfinished when it runs out keep their original text.
+    *progress_callback* is called with a job_progress.JobProgress (chunks
+    done, words/s, chunks/s, ETA) once the plan is known and after every chunk.
     """
-    try:
-        doc, text_blocks = extract_text_and_runs(file_path)
-        
-        if not text_blocks:
-            thread_safe_print("No text found in the document to humanize.")
-            return None
+    refine_deadline = refine_deadline_for(preset)
+    deadline = job_deadline(job_timeout)
+    with log_context(job=new_job_id()), \
+         span("read_docx_and_humanize", file=os.path.basename(file_path), chunk_size=chunk_size,
+              preset=preset or "") as job_span:
+        try:
+            doc, text_blocks = extract_text_and_runs(file_path)
             
-        thread_safe_print(f"Found {len(text_blocks)} text blocks to process.")
-        
-        # Prepare chunks for humanization (based on text blocks)
-        text_to_humanize = [text for _, text in text_blocks]
-        
-        # Simple chunking for the web service, keeping track of original block indices
-        chunks = []
-        current_chunk_text = ""
-        current_chunk_indices = []
-        
-        for i, text in enumerate(text_to_humanize):
-            # Estimate word count (simple split)
-            text_word_count = len(text.split())
-            current_word_count = len(current_chunk_text.split())
+            if not text_blocks:
+                log.warning("No text found in the document to humanize.")
+                return None
+                
+            log.info("Found text blocks to process", extra=kv(blocks=len(text_blocks)))
+            job_span.set_attribute("blocks", len(text_blocks))
             
-            if current_word_count + text_word_count > chunk_size and current_chunk_text:
-                chunks.append({
-                    'text': current_chunk_text.strip(),
-                    'indices': current_chunk_indices
-                })
-                current_chunk_text = text + "\n\n"
-                current_chunk_indices = [i]
-            else:
-                current_chunk_text += text + "\n\n"
-                current_chunk_indices.append(i)
-        
-        if current_chunk_text.strip():
-            chunks.append({
-                'text': current_chunk_text.strip(),
-                'indices': current_chunk_indices
-            })
+            # Prepare chunks for humanization (based on text blocks)
+            chunks = plan_docx_chunks([text for _, text in text_blocks], chunk_size)
+                
+            planned_words = sum(c['words'] for c in chunks)
+            document_words = sum(len(text.split()) for _, text in text_blocks)
+            log.info("Split document into chunks for web service", extra=kv(
+                chunks=len(chunks), words=planned_words, deduplicated_words=document_words - planned_words
+            ))
+            job_span.set_attributes(
+                chunks=len(chunks),
+                words=planned_words,
+                deduplicated_words=document_words - planned_words
+            )
             
-        thread_safe_print(f"Split into {len(chunks)} chunks for web service.")
-        
-        humanized_texts = {} # {original_block_index: humanized_text}
-        
-        for i, chunk_data in enumerate(chunks):
-            thread_safe_print(f"\n{'='*70}")
-            thread_safe_print(f"Processing Chunk {i+1}/{len(chunks)}: {len(chunk_data['text'].split())} words")
-            thread_safe_print(f"{'='*70}")
+            humanized_texts = {} # {original_block_index: humanized_text}
             
-            # Humanize the chunk
-            humanized_chunk_text = get_texttohuman_humanizer_final(chunk_data['text'], page, save_debug=False)
+            progress = JobProgress([c['words'] for c in chunks], concurrency=driver_concurrency(page))
             
-            if humanized_chunk_text:
-                # Simple split of the humanized chunk back into blocks. 
-                # This is a simplification and assumes the humanizer preserves the number of paragraphs.
-                # A more robust solution would require a more sophisticated text alignment algorithm.
-                # For now, we rely on the fact that the humanizer output is a single block of text.
-                
-                # Since the humanizer returns a single block of text, we'll replace the entire chunk's content
-                # with the humanized text, and then try to re-split it based on the original block count.
-                
-                # The safest bet is to replace the text in the first block of the chunk and clear the rest,
-                # but that loses content. The best we can do with the current web service is to 
-                # assume the humanized text is a single block and replace the text of the first block.
-                # However, the original code used a simple \n\n split, so we'll try to mimic that.
-                
-                # For a single chunk, we assume the humanized text corresponds to the original blocks
-                # joined by \n\n.
-                
-                # Split the humanized text back into blocks based on the separator used for joining.
-                # This is highly fragile, but necessary given the current architecture.
-                humanized_blocks = humanized_chunk_text.split('\n\n')
-                
-                # Pad or truncate the humanized blocks to match the original block count
-                original_block_count = len(chunk_data['indices'])
-                
-                if len(humanized_blocks) < original_block_count:
-                    # Pad with empty strings if the humanizer merged blocks
-                    humanized_blocks.extend([''] * (original_block_count - len(humanized_blocks)))
-                elif len(humanized_blocks) > original_block_count:
-                    # Truncate or merge extra blocks if the humanizer split blocks
-                    # For simplicity, we'll truncate the extra blocks
-                    humanized_blocks = humanized_blocks[:original_block_count]
-                
-                # Map the humanized text back to the original block indices
-                for j, original_index in enumerate(chunk_data['indices']):
-                    humanized_texts[original_index] = humanized_blocks[j]
-            else:
-                thread_safe_print(f"✗ Chunk {i+1} returned no result. Skipping replacement for this chunk.")
-        
-        # Replace text in the original document structure
-        for i, (block, original_text) in enumerate(text_blocks):
-            if i in humanized_texts:
-                new_text = humanized_texts[i]
-                if isinstance(block, Paragraph):
-                    replace_text_in_paragraph(block, new_text)
-                elif isinstance(block, _Cell):
-                    # For cells, we assume the text block was the first paragraph in the cell
-                    if block.paragraphs and block.paragraphs[0].text == original_text:
-                        replace_text_in_paragraph(block.paragraphs[0], new_text)
-                    else:
-                        # Fallback: clear cell and add new paragraph
-                        for p in block.paragraphs:
-                            p.clear()
-                        block.text = new_text
-        
-        # Save to BytesIO buffer
-        buffer = BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-        
-        return buffer
-        
-    except Exception as e:
-        thread_safe_print(f"Error processing DOCX for humanization: {e}")
-        return None
+            def on_chunk_done(index, result):
+                progress.chunk_done(index, result)
+                log.info("Job progress", extra=kv(**progress.snapshot()))
+                if progress_callback:
+                    progress_callback(progress)
+            
+            if progress_callback:
+                progress_callback(progress)
+            
+            # Humanize the chunks (in parallel when *page* is a pool)
+            chunk_results = humanize_chunks([c['text'] for c in chunks], page, progress_callback=on_chunk_done,
+                                            save_debug=False, preset=preset, refine_deadline=refine_deadline,
+                                            deadline=deadline)
+            job_span.set_attributes(words_per_second=round(progress.words_per_second, 2),
+                                    chunks_per_second=round(progress.chunks_per_second, 4))
+            
+            for i, (chunk_data, humanized_chunk_text) in enumerate(zip(chunks, chunk_results)):
+                if humanized_chunk_text:
+                    # Simple split of the humanized chunk back into blocks. 
+                    # This is a simplification and assumes the humanizer preserves the number of paragraphs.
+                    # A more robust solution would require a more sophisticated text alignment algorithm.
+                    # For now, we rely on the fact that the humanizer output is a single block of text.
+                    
+                    # Since the humanizer returns a single block of text, we'll replace the entire chunk's content
+                    # with the humanized text, and then try to re-split it based on the original block count.
+                    
+                    # The safest bet is to replace the text in the first block of the chunk and clear the rest,
+                    # but that loses content. The best we can do with the current web service is to 
+                    # assume the humanized text is a single block and replace the text of the first block.
+                    # However, the original code used a simple \n\n split, so we'll try to mimic that.
+                    
+                    # For a single chunk, we assume the humanized text corresponds to the original blocks
+                    # joined by \n\n.
+                    
+                    # Split the humanized text back into blocks based on the separator used for joining.
+                    # This is highly fragile, but necessary given the current architecture.
+                    humanized_blocks = humanized_chunk_text.split('\n\n')
+                    
+                    # Pad or truncate the humanized blocks to match the original block count
+                    original_block_count = len(chunk_data['indices'])
+                    
+                    if len(humanized_blocks) < original_block_count:
+                        # Pad with empty strings if the humanizer merged blocks
+                        humanized_blocks.extend([''] * (original_block_count - len(humanized_blocks)))
+                    elif len(humanized_blocks) > original_block_count:
+                        # Truncate or merge extra blocks if the humanizer split blocks
+                        # For simplicity, we'll truncate the extra blocks
+                        humanized_blocks = humanized_blocks[:original_block_count]
+                    
+                    # Map the humanized text back to the original block indices,
+                    # including every repeat of a deduplicated block
+                    for j, block_indices in enumerate(chunk_data['occurrences']):
+                        for original_index in block_indices:
+                            humanized_texts[original_index] = humanized_blocks[j]
+                else:
+                    log.warning("Chunk returned no result, skipping replacement", extra=kv(chunk=i + 1))
+            
+            # Replace text in the original document structure
+            for i, (block, original_text) in enumerate(text_blocks):
+                if i in humanized_texts:
+                    new_text = humanized_texts[i]
+                    if isinstance(block, Paragraph):
+                        replace_text_in_paragraph(block, new_text)
+                    elif isinstance(block, _Cell):
+                        # For cells, we assume the text block was the first paragraph in the cell
+                        if block.paragraphs and block.paragraphs[0].text == original_text:
+                            replace_text_in_paragraph(block.paragraphs[0], new_text)
+                        else:
+                            # Fallback: clear cell and add new paragraph
+                            for p in block.paragraphs:
+                                p.clear()
+                            block.text = new_text
+            
+            # Save to BytesIO buffer
+            buffer = BytesIO()
+            doc.save(buffer)
+            buffer.seek(0)
+            
+            return buffer
+            
+        except Exception as e:
+            job_span.record_error(e)
+            log.error(f"Error processing DOCX for humanization: {e}")
+            return None
 
 # The original read_docx_with_spacing is no longer needed for the main flow, 
 # but we keep it for compatibility if other parts of the code still use it.
@@ -251,94 +361,157 @@ def read_docx_with_spacing(file_path):
         return full_text
         
     except ImportError:
-        print("Error: python-docx library not installed. Install it using: pip install python-docx")
+        log.error("python-docx library not installed. Install it using: pip install python-docx")
         return None
     except FileNotFoundError:
-        print(f"Error: File not found at path: {file_path}")
+        log.error("File not found", extra=kv(path=file_path))
         return None
     except Exception as e:
-        print(f"Error reading DOCX file: {e}")
+        log.error(f"Error reading DOCX file: {e}")
         return None
 
 class PlaywrightHumanizer:
-    """Context manager for Playwright browser instance"""
+    """
+    Context manager for Playwright browser instance
+    
+    Args:
+        headless: bool - Run the browser without a window
+        debug: bool - Longer timeouts and a screenshot after the page loads
+        block_resources: None | bool | RequestBlockingPolicy - Request blocking policy;
+            None reads HUMANIZER_BLOCK_RESOURCES and friends from the environment
+    """
     
-    def __init__(self, headless=True, debug=False):
+    def __init__(self, headless=True, debug=False, block_resources=None):
         self.playwright = None
         self.browser = None
+        # Command-line switch that identifies this browser's process (see browser_metrics.py)
+        self.browser_marker = None
         self.context = None
         self.page = None
         self.headless = headless
         self.debug = debug
+        self.blocking_policy = resolve_blocking_policy(block_resources)
     
     def __enter__(self):
+        self.playwright = sync_playwright().start()
+        self._launch_browser()
+        self._open_context()
+        self._open_page()
+        return self.page
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._close_browser()
+        if self.playwright:
+            self.playwright.stop()
+            self.playwright = None
+    
+    def _launch_browser(self):
         try:
-            self.playwright = sync_playwright().start()
-            
-            # Launch browser with options
+            # Launch browser with options; Chromium ignores the unknown marker switch
+            self.browser_marker = f"{BROWSER_MARKER_PREFIX}{uuid.uuid4().hex}"
             self.browser = self.playwright.chromium.launch(
                 headless=self.headless,
                 args=[
                     '--no-sandbox',
                     '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage'
+                    '--disable-dev-shm-usage',
+                    self.browser_marker
                 ]
             )
         except Exception as e:
             if "Executable doesn't exist" in str(e):
-                print("\n" + "="*70)
-                print("ERROR: Playwright browsers are not installed!")
-                print("="*70)
-                print("\nPlease run the following command to install browsers:")
-                print("\n    playwright install chromium")
-                print("\nOr install all browsers with:")
-                print("\n    playwright install")
-                print("\n" + "="*70 + "\n")
+                log.error(
+                    "Playwright browsers are not installed! "
+                    "Run 'playwright install chromium' (or 'playwright install' for all browsers)."
+                )
                 raise SystemExit(1)
             else:
                 raise
-        
+    
+    def _open_context(self):
         # Create context with custom user agent and permissions
         self.context = self.browser.new_context(
             user_agent=get_random_user_agent(),
             viewport={'width': 1920, 'height': 1080},
             permissions=['clipboard-read', 'clipboard-write']
         )
+        if self.blocking_policy:
+            self.blocking_policy.install(self.context)
         
         # Enable debug mode if requested
         if self.debug:
             self.context.set_default_timeout(120000)  # 2 minutes for debug
-        
+    
+    def _open_page(self, deadline=None):
         # Create page
         self.page = self.context.new_page()
         self.page.set_default_timeout(60000)  # 60 seconds
         
-        # Navigate to website
-        print(f"Navigating to {WEBSITE_URL}...")
-        self.page.goto(WEBSITE_URL, wait_until='networkidle')
-        print("Page loaded successfully!")
+        # Navigate to website (a recycle between chunks is capped by the job deadline)
+        log.info("Navigating to website", extra=kv(url=WEBSITE_URL))
+        self.page.goto(WEBSITE_URL, wait_until='domcontentloaded', timeout=wait_ms(deadline, 60000, "page load"))
+        _wait_for_form(self.page, deadline=deadline)
+        log.info("Page loaded successfully")
         
         # Take screenshot if debug mode
         if self.debug:
             self.page.screenshot(path="debug_page_loaded.png")
-            print("Screenshot saved: debug_page_loaded.png")
-        
-        return self.page
+            log.debug("Screenshot saved", extra=kv(path="debug_page_loaded.png"))
     
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    def _close_page(self):
         if self.page:
-            self.page.close()
+            try:
+                self.page.close()
+            except Exception as e:
+                log.debug(f"Ignoring error while closing page: {e}")
+            self.page = None
+    
+    def _close_context(self):
+        self._close_page()
         if self.context:
-            self.context.close()
+            try:
+                self.context.close()
+            except Exception as e:
+                log.debug(f"Ignoring error while closing context: {e}")
+            self.context = None
+    
+    def _close_browser(self):
+        self._close_context()
         if self.browser:
-            self.browser.close()
-        if self.playwright:
-            self.playwright.stop()
+            try:
+                self.browser.close()
+            except Exception as e:
+                log.debug(f"Ignoring error while closing browser: {e}")
+            self.browser = None
+    
+    def recycle_page(self, deadline=None):
+        """Replace the page with a fresh one in the same browser context"""
+        self._close_page()
+        self._open_page(deadline)
+        return self.page
+    
+    def recycle_context(self, deadline=None):
+        """Replace the browser context (cookies, cache, storage) and its page"""
+        self._close_context()
+        self._open_context()
+        self._open_page(deadline)
+        return self.page
+    
+    def restart_browser(self, deadline=None):
+        """Close and relaunch the whole browser process"""
+        self._close_browser()
+        self._launch_browser()
+        self._open_context()
+        self._open_page(deadline)
+        return self.page
 
-def get_huminizer_chrome_driver():
+def get_huminizer_chrome_driver(block_resources=None):
     """
     Create and return a Playwright page instance.
     Note: Use context manager PlaywrightHumanizer instead for proper resource management.
+    
+    Args:
+        block_resources: None | bool | RequestBlockingPolicy - See PlaywrightHumanizer
     """
     playwright = sync_playwright().start()
     browser = playwright.chromium.launch(
@@ -355,10 +528,14 @@ def get_huminizer_chrome_driver():
         viewport={'width': 1920, 'height': 1080},
         permissions=['clipboard-read', 'clipboard-write']
     )
+    blocking_policy = resolve_blocking_policy(block_resources)
+    if blocking_policy:
+        blocking_policy.install(context)
     
     page = context.new_page()
     page.set_default_timeout(60000)
-    page.goto(WEBSITE_URL, wait_until='networkidle')
+    page.goto(WEBSITE_URL, wait_until='domcontentloaded')
+    wait_for_humanizer_ready(page)
     
     # Store references for cleanup
     page._playwright = playwright
@@ -401,292 +578,614 @@ def split_text_preserve_paragraphs_and_newlines(text, chunk_size=2000):
     
     return chunks
 
-def get_Zero_Human_Alternative(dialog, page):
+class PageLost(Exception):
+    """Raised by _first_pass when its page crashed or was closed mid-chunk"""
+
+def _watch_page(page):
+    """Flag *page* when its renderer crashes (once per page)"""
+    if not getattr(page, '_humanizer_crash_watched', False):
+        page.on("crash", lambda *_: setattr(page, '_humanizer_crashed', True))
+        page._humanizer_crash_watched = True
+
+def _check_page_alive(page):
+    """Raise PageLost if *page* crashed or was closed (see _watch_page)"""
+    if getattr(page, '_humanizer_crashed', False):
+        raise PageLost("Page crashed while processing")
+    if page.is_closed():
+        raise PageLost("Page closed while processing")
+
+class PartialOutput(Exception):
+    """Raised by _first_pass when the site timed out after producing some output"""
+    
+    def __init__(self, text):
+        super().__init__("Processing timed out with partial output")
+        self.text = text
+
+def get_Zero_Human_Alternative(dialog, page, settings: Optional[HumanizerSettings] = None,
+                               refine_deadline: Optional[float] = None):
     """
     Get the alternative button with "Human" type and 0% score.
-    Retries up to 6 times by clicking reload if not found.
+    Retries up to settings.max_retries times by clicking reload if not found.
     
     Args:
         dialog: Locator - The dialog containing alternatives
         page: Page - Playwright page instance
+        settings: HumanizerSettings - Engine limits (default: get_settings())
+        refine_deadline: float - Wall-clock time after which no more reloads are made;
+            also caps every wait
         
     Returns:
-        str: The text of the best alternative, or None if not found
+        Tuple[str, float]: The text and Human score of the chosen alternative,
+        or None if none scored below settings.score_threshold
     """
-    max_retries = 6
+    settings = settings or get_settings()
+    max_retries = settings.max_retries
     
-    for attempt in range(max_retries):
-        print(f"   Attempt {attempt + 1}/{max_retries} to find 0% Human alternative...")
-        
-        try:
-            # Get alternatives container
-            alternatives_container = dialog.locator('div.space-y-2').first
-            alternatives_container.wait_for(state='visible', timeout=30000)
-            
-            alternative_buttons = alternatives_container.locator('button').all()
-            
-            if not alternative_buttons:
-                print(f"   ✗ No alternative buttons found on attempt {attempt + 1}")
-            else:
-                # Process each button to find 0% Human alternative
-                for button in alternative_buttons:
-                    try:
-                        spans_container = button.locator('div.flex.items-center.gap-2.text-xs').first
-                        spans = spans_container.locator('span').all()
-                        
-                        if len(spans) >= 2:
-                            alternative_type = spans[0].inner_text()
-                            alternative_score_text = spans[1].inner_text()
-                            
-                            if alternative_type == "Human":
-                                try:
-                                    alternative_score = float(alternative_score_text.replace('%', ''))
-                                except ValueError:
-                                    print(f"   ⚠ Could not parse score: {alternative_score_text}")
-                                    continue
-                                
-                                alternative_text_elem = button.locator('p.text-sm.text-foreground.flex-1').first
-                                alternative_text = alternative_text_elem.inner_text()
-                                
-                                print(f"   Found Human alternative: {alternative_score}% - {alternative_text[:50]}...")
-                                
-                                if alternative_score < 15.0:
-                                    print(f"   ✓ Found 0% Human alternative!")
-                                    button.click()
-                                    return alternative_text
-                        
-                    except Exception as e:
-                        print(f"   ⚠ Error processing button: {e}")
-                        continue
+    with span("get_Zero_Human_Alternative", max_retries=max_retries) as search_span:
+        for attempt in range(max_retries):
+            log.debug("Looking for 0% Human alternative", extra=kv(attempt=attempt + 1, max_retries=max_retries))
+            search_span.set_attribute("retries", attempt)
             
-            # If not found and not the last attempt, try reloading
-            if attempt < max_retries - 1:
+            with span("dialog_attempt", attempt=attempt + 1) as attempt_span:
                 try:
-                    reload_container = dialog.locator('div.flex.justify-end').first
-                    reload_button = reload_container.locator('button').first
+                    # Get alternatives container
+                    alternatives_container = dialog.locator(ALTERNATIVES_SELECTOR).first
+                    alternatives_container.wait_for(state='visible', timeout=wait_ms(refine_deadline, settings.wait_timeout_ms))
                     
-                    reload_button.click()
-                    print(f"   ✓ Clicked reload button, waiting...")
-                    time.sleep(2)
+                    alternative_buttons = alternatives_container.locator('button').all()
+                    attempt_span.set_attribute("alternatives", len(alternative_buttons))
+                    best_score = None
                     
-                    # Wait for alternatives to reload
-                    dialog.locator('div.space-y-2').first.wait_for(state='visible', timeout=30000)
+                    if not alternative_buttons:
+                        log.debug("No alternative buttons found", extra=kv(attempt=attempt + 1))
+                    else:
+                        # Process each button to find 0% Human alternative
+                        for button in alternative_buttons:
+                            try:
+                                spans_container = button.locator(ALTERNATIVE_META_SELECTOR).first
+                                spans = spans_container.locator('span').all()
+                                
+                                if len(spans) >= 2:
+                                    alternative_type = spans[0].inner_text()
+                                    alternative_score_text = spans[1].inner_text()
+                                    
+                                    if alternative_type == "Human":
+                                        try:
+                                            alternative_score = float(alternative_score_text.replace('%', ''))
+                                        except ValueError:
+                                            log.warning("Could not parse score", extra=kv(score=alternative_score_text))
+                                            continue
+                                        
+                                        alternative_text_elem = button.locator(ALTERNATIVE_TEXT_SELECTOR).first
+                                        alternative_text = alternative_text_elem.inner_text()
+                                        
+                                        log.debug("Found Human alternative", extra=kv(score=alternative_score, text=alternative_text))
+                                        if best_score is None or alternative_score < best_score:
+                                            best_score = alternative_score
+                                            attempt_span.set_attribute("best_score", best_score)
+                                        
+                                        if alternative_score < settings.score_threshold:
+                                            log.debug("Found 0% Human alternative", extra=kv(score=alternative_score))
+                                            button.click()
+                                            attempt_span.set_attribute("chosen", True)
+                                            search_span.set_attributes(found=True, score=alternative_score)
+                                            return alternative_text, alternative_score
+                                
+                            except Exception as e:
+                                log.warning(f"Error processing alternative button: {e}")
+                                continue
                     
+                    # If not found and not the last attempt, try reloading
+                    if attempt < max_retries - 1 and deadline_passed(refine_deadline):
+                        log.info("Refinement budget exhausted, keeping mark as is")
+                        break
+                    if attempt < max_retries - 1:
+                        try:
+                            reload_container = dialog.locator(RELOAD_CONTAINER_SELECTOR).first
+                            reload_button = reload_container.locator('button').first
+                            
+                            reload_button.click()
+                            log.debug("Clicked reload button, waiting")
+                            pause(settings.reload_pause, refine_deadline, page)
+                            
+                            # Wait for alternatives to reload
+                            dialog.locator(ALTERNATIVES_SELECTOR).first.wait_for(
+                                state='visible', timeout=wait_ms(refine_deadline, settings.wait_timeout_ms)
+                            )
+                            
+                        except Exception as e:
+                            log.warning(f"Failed to reload alternatives: {e}")
+                            attempt_span.record_error(e)
+                            break
+                    else:
+                        log.info("Max retries reached, no 0% Human alternative found")
+                
                 except Exception as e:
-                    print(f"   ✗ Failed to reload alternatives: {e}")
-                    break
-            else:
-                print(f"   ✗ Max retries reached, no 0% Human alternative found")
+                    log.warning(f"Error on alternative attempt: {e}", extra=kv(attempt=attempt + 1))
+                    attempt_span.record_error(e)
+                    if attempt < max_retries - 1:
+                        pause(settings.reload_pause, refine_deadline, page)
+                    continue
         
-        except Exception as e:
-            print(f"   ✗ Error on attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-            continue
+        search_span.set_attribute("found", False)
     
     return None
 
-def get_texttohuman_humanizer_final(humanize_text, page, timeout=30000, save_debug=False):
+def get_texttohuman_humanizer_final(humanize_text, page, timeout=None, save_debug=False,
+                                    preset=None, refine_deadline=None, deadline=None):
     """
     Humanize text using Playwright
     
+    Concurrent calls for the same (normalized) text and preset are coalesced:
+    only one runs in the browser and the others share its result. Set
+    HUMANIZER_COALESCE=0 to disable.
+    
     Args:
         humanize_text: str - Text to humanize
         page: Page - Playwright page instance
-        timeout: int - Timeout in milliseconds
+        timeout: int - Timeout in milliseconds (default: the preset's wait_timeout_ms)
         save_debug: bool - Save debug screenshots on error
+        preset: str - Settings preset, "fast", "balanced" or "thorough" (default: HUMANIZER_PRESET)
+        refine_deadline: float - Wall-clock time after which no further marks are refined
+            (see presets.refine_deadline_for)
+        deadline: float - Job deadline (see deadlines.py); every wait is capped by the
+            time left and the chunk fails once it has passed
     """
-    processing_timeout = 60
+    def run():
+        return _humanize_on_page(humanize_text, page, timeout, save_debug, preset, refine_deadline, deadline)
     
-    try:
-        print(f"Processing text with {len(humanize_text)} characters...")
-        
-        # Wait for page to be fully loaded
-        page.wait_for_load_state('networkidle', timeout=timeout)
-        time.sleep(2)
-        
-        # Wait for textarea and clear it
-        print("Locating textarea...")
-        textarea = page.locator('textarea[data-slot="textarea"]').first
-        textarea.wait_for(state='visible', timeout=timeout)
-        
-        # Clear and focus textarea
-        textarea.click()
-        textarea.fill('')
-        time.sleep(1)
-        
-        # Scroll textarea into view
-        textarea.scroll_into_view_if_needed()
-        
-        # Try multiple methods to input text
-        print("Attempting to paste text...")
-        
-        # Method 1: Try using clipboard paste button
+    if not COALESCE_REQUESTS:
+        return run()
+    # A fast-preset result must not be handed to a caller that asked for thorough
+    return _inflight_chunks.do((preset_name(preset), normalize_chunk(humanize_text)), run, deadline)
+
+def _humanize_on_page(humanize_text, page, timeout=None, save_debug=False, preset=None, refine_deadline=None,
+                      deadline=None, salvage_depth=0):
+    """
+    Run one chunk through the site on *page* (see get_texttohuman_humanizer_final).
+    """
+    settings = get_settings(preset)
+    timeout = timeout or settings.wait_timeout_ms
+    # Refinement ends at the job deadline at the latest, keeping the marks done so far
+    refine_deadline = earliest(refine_deadline, deadline)
+    
+    words = len(humanize_text.split())
+    started = time.monotonic()
+    first_pass_seconds = None
+    
+    with span("get_texttohuman_humanizer_final", chars=len(humanize_text),
+              words=words) as humanize_span:
         try:
-            print("Trying direct input method...")
-            
-            # Method 2: Direct fill
-            textarea.fill(humanize_text)
-            time.sleep(1)
+            check_deadline(deadline, "chunk")
+            humanized_text = _first_pass(humanize_text, page, timeout, save_debug, settings, deadline)
+            first_pass_seconds = time.monotonic() - started
+            marks = page.locator(OUTPUT_SELECTOR).first.locator(MARK_SELECTOR).count()
+            humanize_text1 = _refine_marks(humanized_text, page, settings, refine_deadline)
+            humanize_span.set_attribute("output_words", len(humanize_text1.split()))
+            # Feed the chunk-size autotuner
+            record_chunk(words, marks, first_pass_seconds, time.monotonic() - started, True, preset)
             
-            # Method 3: Type with keyboard simulation (fallback)
-            if not textarea.input_value():
-                print("Direct fill failed, trying keyboard input...")
-                textarea.click()
-                page.keyboard.insert_text(humanize_text)
-                time.sleep(1)
+            if artifacts_enabled():
+                save_chunk_artifacts(input=humanize_text, humanized=humanize_text1,
+                                     final=_read_final_output(page, timeout, deadline))
             
-        except Exception as e:
-            print(f"Paste button method failed: {e}")
-            pyperclip.copy(humanize_text)
-            paste_button = page.locator('button.bg-primary\\/10').first
-            
-            if paste_button.is_visible(timeout=5000):
-                print("Found paste button, clicking...")
-                paste_button.click()
-                time.sleep(2)
-            else:
-                raise Exception("Paste button not visible")
-        
-        # Verify text was entered
-        current_value = textarea.input_value()
-        print(f"Textarea now has {len(current_value)} characters")
+            return humanize_text1
         
-        if len(current_value) < 10:
-            if save_debug:
-                page.screenshot(path="debug_text_input_failed.png")
-            raise Exception("Failed to enter text into textarea")
+        except PartialOutput as partial:
+            record_chunk(words, None, None, time.monotonic() - started, False, preset)
+            return _salvage_partial_output(humanize_text, partial.text, page, timeout, save_debug, preset,
+                                           refine_deadline, deadline, salvage_depth)
+        except DeadlineExceeded as e:
+            humanize_span.record_error(e)
+            log.error(f"Chunk abandoned: {e}")
+            return None
+        except SiteChangedError as e:
+            # Every other chunk would fail the same way; let the caller stop the job
+            humanize_span.record_error(e)
+            raise
+        except Exception as e:
+            humanize_span.record_error(e)
+            log.error(f"Error occurred: {e}")
+            record_chunk(words, None, first_pass_seconds, time.monotonic() - started, False, preset)
+            return None
+
+def _read_final_output(page, timeout, deadline=None):
+    """
+    The output as rendered after refinement, for the artifact store only;
+    None past the deadline or when it cannot be read (the chunk is done either way).
+    """
+    if deadline_passed(deadline):
+        return None
+    try:
+        output_element = page.locator(OUTPUT_SELECTOR).first
+        output_element.wait_for(state='visible', timeout=wait_ms(deadline, timeout))
+        humanized_text_final = output_element.inner_text()
+    except Exception as e:
+        log.debug(f"Could not read the final output for the artifact store: {e}")
+        return None
+    log.debug("Final output", extra=kv(text=humanized_text_final))
+    return humanized_text_final
+
+def _salvage_partial_output(humanize_text, partial_text, page, timeout, save_debug, preset,
+                            refine_deadline, deadline, salvage_depth):
+    """
+    Keep the finished paragraphs of a timed-out chunk and run only the
+    unfinished tail again, on a freshly loaded form.
+    
+    Returns:
+        str: Finished output joined with the tail's output, or None if the
+        output cannot be aligned or the tail fails too
+    """
+    split = split_unfinished_tail(humanize_text, partial_text)
+    humanize_span = current_span()
+    humanize_span.set_attribute("partial", True)
+    save_chunk_artifacts(input=humanize_text, partial=partial_text)
+    if split is None or salvage_depth >= MAX_SALVAGE_DEPTH:
+        log.error("Processing timed out and the partial output cannot be salvaged",
+                  extra=kv(partial_chars=len(partial_text)))
+        return None
+    
+    finished_output, separator, tail = split
+    humanize_span.set_attributes(salvaged_words=len(humanize_text.split()) - len(tail.split()),
+                                 tail_words=len(tail.split()))
+    log.warning("Processing timed out; keeping finished paragraphs and resubmitting the rest", extra=kv(
+        kept_words=len(finished_output.split()), tail_words=len(tail.split())
+    ))
+    try:
+        page.goto(WEBSITE_URL, wait_until="domcontentloaded", timeout=wait_ms(deadline, 60000, "reload"))
+    except Exception as e:
+        log.error(f"Could not reload the form for the unfinished tail: {e}")
+        return None
+    with artifact_piece(f"tail{salvage_depth + 1}"):
+        tail_result = _humanize_on_page(tail, page, timeout, save_debug, preset, refine_deadline, deadline,
+                                        salvage_depth + 1)
+    if tail_result is None:
+        return None
+    return finished_output + separator + tail_result
+
+def _first_pass(humanize_text, page, timeout=30000, save_debug=False,
+                settings: Optional[HumanizerSettings] = None, deadline: Optional[float] = None,
+                while_processing=None):
+    """
+    Submit *humanize_text* on *page* and wait for the site's output.
+    *while_processing* (a callable) runs right after Humanize is clicked,
+    while the site works on the text; two-phase mode refines another tab then.
+    
+    Returns:
+        str: The raw output text; its flagged marks stay in the page's DOM
+        for _refine_marks. Raises on failure, DeadlineExceeded once *deadline*
+        has passed, PartialOutput when the site timed out midway, PageLost
+        as soon as the page crashes or closes, and SiteChangedError when
+        the form's elements are missing.
+    """
+    settings = settings or get_settings()
+    log.info("Processing text", extra=kv(chars=len(humanize_text)))
+    _watch_page(page)
+    
+    # Wait until the form is interactive (naming the missing elements if the markup has changed)
+    _wait_for_form(page, timeout=timeout, deadline=deadline)
+    
+    # Wait for textarea and clear it
+    log.debug("Locating textarea")
+    textarea = page.locator(TEXTAREA_SELECTOR).first
+    textarea.wait_for(state='visible', timeout=wait_ms(deadline, timeout, "textarea"))
+    
+    # Scroll textarea into view
+    textarea.scroll_into_view_if_needed(timeout=wait_ms(deadline, timeout))
+    
+    # Replace the textarea's contents in-page (replaces any previous text too)
+    try:
+        set_textarea_text(page, humanize_text)
+    except Exception:
+        if save_debug:
+            page.screenshot(path="debug_text_input_failed.png")
+        raise
+    log.debug("Text entered", extra=kv(chars=len(humanize_text)))
+    
+    # Wait for and click humanize button - try multiple selectors
+    log.debug("Looking for Humanize button")
+    
+    humanize_button = None
+    button_selectors = [
+        'button[data-slot="button"]:not([disabled])',
+        'button:has-text("Humanize")',
+        'button:has-text("Humanize Now")',
+        'button.inline-flex:not([disabled])',
+    ]
+    
+    humanize_button = page.get_by_role("button", name=HUMANIZE_BUTTON_NAME)
+    # Each of these is a browser round trip, so only query them when they are logged
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Humanize button state", extra=kv(
+            count=humanize_button.count(),
+            visible=humanize_button.is_visible(),
+            enabled=humanize_button.is_enabled(timeout=wait_ms(deadline, timeout, "Humanize button state"))
+        ))
+
+    
+    if humanize_button is None:
+        # Debug: Print all buttons on page
+        log.error("Could not find humanize button")
+        all_buttons = page.locator('button').all()
+        for idx, btn in enumerate(all_buttons[:10]):  # Show first 10 buttons
+            try:
+                btn_text = btn.inner_text()
+                if btn_text.strip() == "Humanize Now":
+                    humanize_button = btn
+                btn_disabled = btn.get_attribute('disabled')
+                log.debug("Available button", extra=kv(index=idx, text=btn_text, disabled=btn_disabled))
+            except:
+                pass
         
-        # Wait for and click humanize button - try multiple selectors
-        print("Looking for Humanize button...")
+        if save_debug:
+            page.screenshot(path="debug_button_not_found.png")
         
-        humanize_button = None
-        button_selectors = [
-            'button[data-slot="button"]:not([disabled])',
-            'button:has-text("Humanize")',
-            'button:has-text("Humanize Now")',
-            'button.inline-flex:not([disabled])',
-        ]
+        raise Exception("Could not locate Humanize button")
+    
+    # Click the humanize button
+    log.debug("Clicking Humanize button")
+    max_wait_time = settings.processing_timeout
+    if deadline is not None:
+        max_wait_time = min(max_wait_time, remaining(deadline))
+    check_interval = settings.poll_interval
+    if capture_enabled():
+        captured = _click_and_capture(page, humanize_button, humanize_text, timeout, max_wait_time,
+                                      settings.settle_seconds, deadline, while_processing)
+        if captured is not None:
+            log.debug("First-pass output", extra=kv(text=captured))
+            return captured
+        # No usable response: settle on whatever the page shows
+        max_wait_time = 2 * check_interval
+    else:
+        humanize_button.click(timeout=wait_ms(deadline, timeout, "Humanize click"))
+        if while_processing:
+            while_processing()
+    
+    # Monitor processing status
+    start_time = time.time()
+    last_status = ""
+    last_output = ""
+    
+    while True:
+        elapsed_time = time.time() - start_time
+        # The checks below swallow errors, so a dead page would otherwise poll until the timeout
+        _check_page_alive(page)
         
-        humanize_button = page.get_by_role("button", name="Humanize Now")
-        print("Found:", humanize_button.count())
-        print("Visible:", humanize_button.is_visible())
-        print("Enabled:", humanize_button.is_enabled())
-
+        if elapsed_time > max_wait_time:
+            log.warning("Processing timeout", extra=kv(elapsed=round(elapsed_time, 1), partial_chars=len(last_output)))
+            if last_output:
+                raise PartialOutput(last_output)
+            break
         
-        if humanize_button is None:
-            # Debug: Print all buttons on page
-            print("Could not find humanize button. Available buttons:")
-            all_buttons = page.locator('button').all()
-            for idx, btn in enumerate(all_buttons[:10]):  # Show first 10 buttons
-                try:
-                    btn_text = btn.inner_text()
-                    if btn_text.strip() == "Humanize Now":
-                        humanize_button = btn
-                    btn_disabled = btn.get_attribute('disabled')
-                    print(f"  Button {idx}: '{btn_text}' (disabled={btn_disabled})")
-                except:
-                    pass
-            
-            if save_debug:
-                page.screenshot(path="debug_button_not_found.png")
-            
-            raise Exception("Could not locate Humanize button")
+        try:
+            status_div = page.locator(STATUS_SELECTOR).first
+            if status_div.is_visible():
+                status_text = status_div.inner_text().strip()
+                
+                if status_text and status_text != last_status:
+                    log.info("Autopilot status", extra=kv(status=status_text, elapsed=int(elapsed_time)))
+                    last_status = status_text
+        except:
+            pass
         
-        # Click the humanize button
-        print("Clicking Humanize button...")
-        humanize_button.click()
+        try:
+            output_element = page.locator(OUTPUT_SELECTOR).first
+            if output_element.is_visible():
+                current_output = output_element.inner_text().strip()
+                # Done once the output has stopped growing between two checks
+                if current_output and current_output == last_output:
+                    break
+                last_output = current_output
+        except:
+            pass
         
-        # Monitor processing status
-        start_time = time.time()
-        max_wait_time = processing_timeout
-        check_interval = 2
-        last_status = ""
+        # Re-check soon once output has started arriving
+        pause(settings.settle_seconds if last_output else check_interval, deadline, page)
+    
+    # Get output text
+    output_element = page.locator(OUTPUT_SELECTOR).first
+    output_element.wait_for(state='visible', timeout=wait_ms(deadline, timeout, "output"))
+    
+    
+    humanized_text = output_element.inner_text()
+    log.debug("First-pass output", extra=kv(text=humanized_text))
+    return humanized_text
+
+# Cheap signals of a change in the output; the text itself is read once, after it has settled
+_OUTPUT_STATE_SCRIPT = """([outputSelector, markSelector, statusSelector]) => {
+    const output = document.querySelector(outputSelector);
+    const status = document.querySelector(statusSelector);
+    return [
+        output ? output.textContent.trim().length : 0,
+        output ? output.querySelectorAll(markSelector).length : 0,
+        status ? status.innerText.trim() : '',
+    ];
+}"""
+
+def _wait_for_output_settled(page, settle_seconds, timeout, deadline=None):
+    """
+    Wait until the output's text length, its mark count and the status line
+    read the same on two checks *settle_seconds* apart, so marks the site adds after
+    its response has arrived are in the DOM before refinement starts. Gives
+    up quietly after *timeout* milliseconds.
+    """
+    give_up = time.monotonic() + wait_ms(deadline, timeout, "output") / 1000
+    last_state = None
+    while True:
+        _check_page_alive(page)
+        state = page.evaluate(_OUTPUT_STATE_SCRIPT, [OUTPUT_SELECTOR, MARK_SELECTOR, STATUS_SELECTOR])
+        if state[0] and state == last_state:
+            return
+        if time.monotonic() >= give_up or deadline_passed(deadline):
+            log.warning("Output still changing, continuing with what is rendered",
+                        extra=kv(chars=state[0], marks=state[1], status=state[2]))
+            return
+        last_state = state
+        pause(settle_seconds, deadline, page)
+
+def _click_and_capture(page, humanize_button, humanize_text, timeout, max_wait_time, settle_seconds,
+                       deadline=None, while_processing=None):
+    """
+    Click Humanize and wait for the site's humanize response instead of
+    polling the output (see response_capture.py).
+    
+    Args:
+        page: Page - Playwright page instance
+        humanize_button: Locator - The Humanize button
+        humanize_text: str - The submitted text; a payload that merely echoes
+            it is not taken as the output
+        timeout: int - Timeout in milliseconds for the click and the output render
+        max_wait_time: float - Seconds to wait for the response
+        settle_seconds: float - Interval of the checks that the output has settled
+        deadline: float - Job deadline (see deadlines.py)
+        while_processing: callable() - Run after the click, before waiting for the response
         
-        while True:
-            elapsed_time = time.time() - start_time
-            
-            if elapsed_time > max_wait_time:
-                thread_safe_print(f"Timeout after {elapsed_time:.1f} seconds")
+    Returns:
+        str: The output text, or None when no humanize response arrived in
+        time (the caller then reads the output from the page)
+    """
+    pattern = response_pattern()
+    clicked = False
+    try:
+        with page.expect_response(lambda response: is_humanize_response(response, pattern),
+                                  timeout=wait_ms(deadline, max_wait_time * 1000, "humanize response")) as response_info:
+            humanize_button.click(timeout=wait_ms(deadline, timeout, "Humanize click"))
+            clicked = True
+            if while_processing:
+                while_processing()
+        response = response_info.value
+    except PlaywrightTimeout:
+        if not clicked:
+            raise
+        disable_capture(pattern)
+        return None
+    
+    if not response.ok:
+        raise Exception(f"Humanize request failed with HTTP {response.status}")
+    try:
+        text = extract_output_text(response.text())
+    except Exception as e:
+        log.debug(f"Could not read the humanize response body: {e}")
+        text = None
+    if text is not None and normalize_chunk(text) == normalize_chunk(humanize_text):
+        # OUTPUT_KEYS is a guess at the payload; "text" or "content" may hold the input
+        log.debug("Humanize response only echoes the input, reading the output from the page",
+                  extra=kv(url=response.url))
+        text = None
+    current_span().set_attribute("response_captured", text is not None)
+    
+    # The marks refined next live in the rendered output, so wait for it to render and settle
+    page.wait_for_function(
+        """selector => {
+            const output = document.querySelector(selector);
+            return !!output && output.innerText.trim().length > 0;
+        }""",
+        arg=OUTPUT_SELECTOR,
+        timeout=wait_ms(deadline, timeout, "output")
+    )
+    _wait_for_output_settled(page, settle_seconds, timeout, deadline)
+    if text is None:
+        log.debug("No output text in the humanize response, reading it from the page", extra=kv(url=response.url))
+        text = page.locator(OUTPUT_SELECTOR).first.inner_text()
+    return text
+
+def _refine_marks(humanized_text, page, settings: Optional[HumanizerSettings] = None,
+                  refine_deadline: Optional[float] = None):
+    """
+    Replace the yellow/red marks in the output currently shown on *page*
+    with their best 0% Human alternatives.
+    
+    Args:
+        humanized_text: str - Output text returned by _first_pass on this page
+        page: Page - Page still showing that output
+        settings: HumanizerSettings - Engine limits (default: get_settings())
+        refine_deadline: float - Wall-clock time after which the remaining marks are left
+            as they are; also caps every wait
+    
+    Returns:
+        str: humanized_text with every replaceable mark swapped
+    """
+    settings = settings or get_settings()
+    output_element = page.locator(OUTPUT_SELECTOR).first
+    humanize_text1 = humanized_text
+    
+    # Process marks (highlighted sections)
+    marks = output_element.locator(MARK_SELECTOR).all()
+    current_span().set_attribute("marks", len(marks))
+    
+    alternative_cache = get_alternative_cache() if marks else None
+    if marks:
+        for i, mark in enumerate(marks):
+            if deadline_passed(refine_deadline):
+                current_span().set_attribute("budget_exhausted", True)
+                log.info("Refinement budget exhausted, returning best result so far",
+                         extra=kv(refined=i, total=len(marks)))
                 break
             
-            try:
-                status_div = page.locator('div.flex.items-center.gap-4.text-xs.text-primary').first
-                if status_div.is_visible():
-                    status_text = status_div.inner_text().strip()
-                    
-                    if status_text and status_text != last_status:
-                        thread_safe_print(f"⚡ Autopilot: {status_text} ({int(elapsed_time)}s elapsed)")
-                        last_status = status_text
-            except:
-                pass
+            mark_class = mark.get_attribute('class') or ""
             
-            try:
-                output_element = page.locator('div.p-4.overflow-y-auto.rounded-lg.h-full.text-foreground.bg-background').first
-                if output_element.is_visible() and output_element.inner_text().strip():
-                    break
-            except:
-                pass
-            
-            time.sleep(check_interval)
-        
-        # Get output text
-        output_element = page.locator('div.p-4.overflow-y-auto.rounded-lg.h-full.text-foreground.bg-background').first
-        output_element.wait_for(state='visible', timeout=timeout)
-        
-        
-        humanized_text = output_element.inner_text()
-        print(humanized_text)
-        humanize_text1 = humanized_text
-        
-        # Process marks (highlighted sections)
-        marks = output_element.locator('mark').all()
-        
-        if marks:
-            for i, mark in enumerate(marks):
-                mark_class = mark.get_attribute('class') or ""
+            if ('bg-yellow-100' in mark_class) or ('bg-yellow-900' in mark_class) or \
+               ('bg-red-100' in mark_class) or ('bg-red-900' in mark_class):
                 
-                if ('bg-yellow-100' in mark_class) or ('bg-yellow-900' in mark_class) or \
-                   ('bg-red-100' in mark_class) or ('bg-red-900' in mark_class):
-                    
-                    mark_type = "yellow" if 'yellow' in mark_class else "red"
-                    print(f"\n🔄 Processing {mark_type} mark {i+1}/{len(marks)}")
-                    
-                    mark_text = mark.inner_text()
-                    print(f"   Original text: {mark_text[:80]}...")
-                    
+                mark_type = "yellow" if 'yellow' in mark_class else "red"
+                log.info("Processing mark", extra=kv(type=mark_type, mark=i + 1, total=len(marks)))
+                
+                mark_text = mark.inner_text()
+                log.debug("Mark text", extra=kv(text=mark_text))
+                
+                with span("mark", index=i, type=mark_type, chars=len(mark_text)) as mark_span:
+                    # Only reuse alternatives that pass this preset's threshold
+                    cached_alternative = alternative_cache.get(
+                        mark_text, max_score=settings.score_threshold
+                    ) if alternative_cache else None
+                    if cached_alternative is not None:
+                        humanize_text1 = humanize_text1.replace(mark_text, cached_alternative, 1)
+                        mark_span.set_attributes(replaced=True, cache_hit=True)
+                        log.info("Replaced mark with cached alternative", extra=kv(mark=i + 1))
+                        continue
                     try:
-                        mark.scroll_into_view_if_needed()
-                        time.sleep(1)
-                        mark.click()
+                        mark.scroll_into_view_if_needed(timeout=wait_ms(refine_deadline, settings.wait_timeout_ms))
+                        pause(settings.settle_seconds, refine_deadline, page)
+                        mark.click(timeout=wait_ms(refine_deadline, settings.wait_timeout_ms))
                         
                         # Wait for dialog
-                        dialog = page.locator('div[role="dialog"]').first
-                        dialog.wait_for(state='visible', timeout=30000)
-                        
-                        # Wait for alternatives to load
-                        dialog.locator('div.space-y-2').first.wait_for(state='visible', timeout=30000)
-                        print("   ✓ Dialog loaded with alternatives")
+                        dialog = page.locator(DIALOG_SELECTOR).first
+                        try:
+                            dialog.wait_for(state='visible', timeout=wait_ms(refine_deadline, settings.wait_timeout_ms))
+                            
+                            # Wait for alternatives to load
+                            dialog.locator(ALTERNATIVES_SELECTOR).first.wait_for(
+                                state='visible', timeout=wait_ms(refine_deadline, settings.wait_timeout_ms)
+                            )
+                        except PlaywrightTimeout:
+                            # Tell a slow dialog from one whose markup has changed
+                            preflight(page, STAGE_DIALOG, timeout=0)
+                            raise
+                        log.debug("Dialog loaded with alternatives")
                         
                         # If mark_text is empty, get from textarea
                         if mark_text.strip() == "":
                             try:
                                 textarea_in_dialog = dialog.locator('textarea').first
                                 mark_text = textarea_in_dialog.input_value()
-                                print(f"   Retrieved text from textarea: {mark_text[:80]}...")
+                                log.debug("Retrieved mark text from dialog textarea", extra=kv(text=mark_text))
                             except Exception as e:
-                                print(f"   ✗ Failed to get textarea text: {e}")
+                                log.warning(f"Failed to get dialog textarea text: {e}")
                                 continue
                         
                         # Get best alternative
-                        best_alternative_text = get_Zero_Human_Alternative(dialog, page)
+                        best_alternative = get_Zero_Human_Alternative(dialog, page, settings, refine_deadline)
                         
-                        if best_alternative_text is not None:
-                            print(f"   ✓ Best alternative text: {best_alternative_text[:80]}...")
+                        if best_alternative is not None:
+                            best_alternative_text, best_score = best_alternative
+                            log.debug("Best alternative text", extra=kv(text=best_alternative_text))
                             humanize_text1 = humanize_text1.replace(mark_text, best_alternative_text, 1)
-                            print(f"   ✓ Replaced text in humanize_text1")
+                            mark_span.set_attribute("replaced", True)
+                            log.info("Replaced mark with alternative", extra=kv(mark=i + 1))
+                            if alternative_cache:
+                                alternative_cache.put(mark_text, best_alternative_text, best_score)
                         else:
-                            print("   ✗ No 0% Human alternative found after all retries")
+                            log.info("No 0% Human alternative found after all retries", extra=kv(mark=i + 1))
                         
                         # Close dialog
                         # try:
@@ -697,31 +1196,249 @@ def get_texttohuman_humanizer_final(humanize_text, page, timeout=30000, save_deb
                         # except Exception as e:
                         #     print(f"   ⚠ Failed to close dialog: {e}")
                             
+                    except SiteChangedError as e:
+                        mark_span.record_error(e)
+                        log.error("Alternatives dialog has changed, keeping the remaining marks as they are")
+                        break
                     except Exception as e:
-                        print(f"   ✗ Failed to process mark: {e}")
+                        mark_span.record_error(e)
+                        log.warning(f"Failed to process mark: {e}", extra=kv(mark=i + 1))
                         continue
+    
+    return humanize_text1
+
+def humanize_chunk(humanize_text, driver, **kwargs):
+    """
+    Humanize one chunk on either a Playwright page or a managed slot
+    (any object with a ``humanize`` method, e.g. browser_slot.BrowserSlot).
+    
+    A chunk that fails on a page is retried in smaller pieces
+    (see bisect_failed_chunk); slots do the same themselves.
+    
+    Args:
+        humanize_text: str - Text to humanize
+        driver: Page | BrowserSlot - Where to run the chunk
+        **kwargs: Passed to get_texttohuman_humanizer_final
+    """
+    if hasattr(driver, 'humanize'):
+        return driver.humanize(humanize_text, **kwargs)
+    result = get_texttohuman_humanizer_final(humanize_text, driver, **kwargs)
+    if result is None:
+        result = bisect_failed_chunk(
+            humanize_text, lambda piece: get_texttohuman_humanizer_final(piece, driver, **kwargs),
+            deadline=kwargs.get('deadline')
+        )
+    return result
+
+def humanize_chunks(texts, driver, progress_callback=None, **kwargs):
+    """
+    Humanize a list of chunks and return the results in the same order.
+    
+    Args:
+        texts: List[str] - Chunk texts
+        driver: Page | BrowserSlot | pool - Pools (objects with ``humanize_all``) run
+            the chunks in parallel; a page or slot runs them one after another
+        progress_callback: callable(index, result) - Called as each chunk finishes
+        **kwargs: Passed to get_texttohuman_humanizer_final
         
-        # Get output text
-        
+    Returns:
+        List[Optional[str]]: Humanized text per chunk, None where a chunk failed
         
-        output_element1 = page.locator('div.p-4.overflow-y-auto.rounded-lg.h-full.text-foreground.bg-background').first
-        output_element1.wait_for(state='visible', timeout=timeout)
+    Raises:
+        SiteChangedError: The site's markup no longer matches site_selectors.py;
+            the remaining chunks are not attempted
+    """
+    if hasattr(driver, 'humanize_all'):
+        return driver.humanize_all(texts, progress_callback=progress_callback, **kwargs)
+    
+    results = []
+    for i, text in enumerate(texts):
+        log.info("Processing chunk", extra=kv(chunk=i + 1, total=len(texts), words=len(text.split())))
+        with log_context(chunk=i + 1), span("chunk", index=i, words=len(text.split())) as chunk_span:
+            try:
+                result = humanize_chunk(text, driver, **kwargs)
+            except SiteChangedError as e:
+                chunk_span.record_error(e)
+                log.error("Stopping the job, the site no longer matches the engine",
+                          extra=kv(remaining_chunks=len(texts) - i))
+                raise
+            except Exception as e:
+                chunk_span.record_error(e)
+                log.error(f"Error processing chunk: {e}")
+                result = None
+            chunk_span.set_attribute("success", bool(result))
+        results.append(result)
+        if progress_callback:
+            progress_callback(i, result)
+    return results
+
+def humanize_chunks_two_phase(texts, driver, first_pass_callback=None, progress_callback=None,
+                              refine_pages=None, timeout=None, preset=None, refine_deadline=None,
+                              deadline=None, **kwargs):
+    """
+    Humanize chunks in two phases: every chunk's first-pass output is reported
+    as soon as the site returns it, and its marks are refined afterwards.
+    
+    The marks only exist in the DOM of the page that produced the output, so
+    each chunk gets its own tab and is refined on it before the tab closes;
+    no chunk is submitted twice. Refinement is pipelined with the first
+    passes: while the site works on one chunk, the oldest drafted tab is
+    refined. A refinement that outlasts the site's processing delays the
+    next draft by the difference. At most *refine_pages* drafted tabs wait
+    for refinement; beyond that the oldest is refined before the next chunk
+    is submitted, so no more than refine_pages + 1 chunk tabs are open.
+    
+    Chunks whose first pass failed, whose tab was lost before refinement, or
+    that came after a lost browser run again through the driver (a
+    BrowserSlot recycles, respawns, salvages and bisects as usual).
+    
+    Args:
+        texts: List[str] - Chunk texts
+        driver: Page | BrowserSlot | pool - Pools have no page to hand over and
+            run their normal single-phase path (logged as a warning); each
+            result is then reported to both callbacks
+        first_pass_callback: callable(index, text) - Called with the unrefined output
+        progress_callback: callable(index, result) - Called with the refined output
+        refine_pages: int - Drafted tabs that may wait for refinement (default: HUMANIZER_REFINE_PAGES)
+        timeout, preset, refine_deadline, deadline: As for get_texttohuman_humanizer_final
         
-        humanized_text_final = output_element1.inner_text()
-        thread_safe_print("Final Output element is visible, retrieving text...")
-        thread_safe_print("" + humanized_text_final)
-        # Save to file
-        with open("humanized_text_final.txt", "w", encoding="utf-8") as f:
-            f.write(humanized_text_final)
-            
-        with open("humanized_text.txt", "w", encoding="utf-8") as f:
-            f.write(humanize_text1)
+    Returns:
+        List[Optional[str]]: Refined text per chunk; the first-pass text where
+        refinement failed, None where both phases failed
+    """
+    if hasattr(driver, 'humanize_all') or not hasattr(getattr(driver, 'page', driver), 'context'):
+        log.warning("Driver cannot hand pages over, running single-phase without drafts",
+                    extra=kv(driver=type(driver).__name__))
         
-        return humanize_text1
+        def report(index, result):
+            if first_pass_callback:
+                first_pass_callback(index, result)
+            if progress_callback:
+                progress_callback(index, result)
+        return humanize_chunks(texts, driver, progress_callback=report, timeout=timeout, preset=preset,
+                               refine_deadline=refine_deadline, deadline=deadline, **kwargs)
     
-    except Exception as e:
-        print(f"Error occurred: {e}")
-        return None
+    settings = get_settings(preset)
+    timeout = timeout or settings.wait_timeout_ms
+    refine_deadline = earliest(refine_deadline, deadline)
+    refine_pages = refine_pages or REFINE_PAGES
+    if hasattr(driver, 'refresh'):
+        # Same watchdog check a slot runs before each chunk
+        try:
+            driver.refresh(deadline)
+        except DeadlineExceeded as e:
+            log.error(f"Job abandoned: {e}")
+            return [None] * len(texts)
+    context = getattr(driver, 'page', driver).context
+    results = [None] * len(texts)
+    drafts = [None] * len(texts)
+    waiting = deque()  # (index, page, first-pass seconds)
+    
+    def close(chunk_page):
+        try:
+            chunk_page.close()
+        except Exception as e:
+            log.debug(f"Error closing page: {e}")
+    
+    def refine_oldest():
+        index, chunk_page, first_pass_seconds = waiting.popleft()
+        words = len(texts[index].split())
+        started = time.monotonic()
+        with log_context(chunk=index + 1), span("refine_marks", index=index) as refine_span:
+            try:
+                _check_page_alive(chunk_page)
+                marks = chunk_page.locator(OUTPUT_SELECTOR).first.locator(MARK_SELECTOR).count()
+                results[index] = _refine_marks(drafts[index], chunk_page, settings, refine_deadline)
+                record_chunk(words, marks, first_pass_seconds,
+                             first_pass_seconds + time.monotonic() - started, True, preset)
+                save_chunk_artifacts(input=texts[index], first_pass=drafts[index], humanized=results[index])
+            except PageLost as e:
+                # Nothing left to refine on; the chunk runs again below
+                refine_span.record_error(e)
+                log.warning(f"Chunk tab lost before refinement, running the chunk again: {e}")
+            except Exception as e:
+                refine_span.record_error(e)
+                log.warning(f"Mark refinement failed, keeping first-pass text: {e}")
+                record_chunk(words, None, first_pass_seconds,
+                             first_pass_seconds + time.monotonic() - started, False, preset)
+                results[index] = drafts[index]
+        close(chunk_page)
+        if results[index] and progress_callback:
+            progress_callback(index, results[index])
+    
+    def refine_while_processing():
+        # The site is working on the new chunk's tab; use the wait
+        if waiting:
+            refine_oldest()
+    
+    def first_pass(index, text):
+        chunk_page = context.new_page()
+        started = time.monotonic()
+        done = False
+        try:
+            chunk_page.goto(WEBSITE_URL, wait_until="domcontentloaded", timeout=wait_ms(deadline, 60000))
+            drafts[index] = _first_pass(text, chunk_page, timeout, settings=settings, deadline=deadline,
+                                        while_processing=refine_while_processing)
+            done = True
+        except PartialOutput as partial:
+            # The finished paragraphs make a draft; the chunk runs again below
+            drafts[index] = partial.text
+            raise
+        finally:
+            if not done:
+                close(chunk_page)
+        waiting.append((index, chunk_page, time.monotonic() - started))
+    
+    with span("two_phase", chunks=len(texts), refine_pages=refine_pages):
+        try:
+            for i, text in enumerate(texts):
+                while len(waiting) > refine_pages:
+                    refine_oldest()
+                log.info("First pass", extra=kv(chunk=i + 1, total=len(texts), words=len(text.split())))
+                with log_context(chunk=i + 1), span("first_pass", index=i, words=len(text.split())) as pass_span:
+                    try:
+                        check_deadline(deadline, "chunk")
+                        first_pass(i, text)
+                    except SiteChangedError as e:
+                        pass_span.record_error(e)
+                        raise
+                    except Exception as e:
+                        pass_span.record_error(e)
+                        log.error(f"Error in first pass: {e}")
+                    pass_span.set_attribute("success", bool(drafts[i]))
+                if first_pass_callback and drafts[i]:
+                    first_pass_callback(i, drafts[i])
+                browser = context.browser
+                if browser is not None and not browser.is_connected():
+                    # The waiting tabs died with the browser; the driver respawns it below
+                    log.warning("Browser lost during first passes, running the rest single-phase")
+                    break
+            while waiting:
+                refine_oldest()
+        finally:
+            for _, chunk_page, _ in waiting:
+                close(chunk_page)
+        
+        for i, text in enumerate(texts):
+            if results[i]:
+                continue
+            with log_context(chunk=i + 1), span("chunk", index=i, words=len(text.split())) as chunk_span:
+                try:
+                    results[i] = humanize_chunk(text, driver, timeout=timeout, preset=preset,
+                                                refine_deadline=refine_deadline, deadline=deadline, **kwargs)
+                except SiteChangedError as e:
+                    chunk_span.record_error(e)
+                    raise
+                except Exception as e:
+                    chunk_span.record_error(e)
+                    log.error(f"Error processing chunk: {e}")
+                chunk_span.set_attribute("success", bool(results[i]))
+            if not results[i]:
+                # An unrefined draft beats no text at all
+                results[i] = drafts[i]
+            if progress_callback:
+                progress_callback(i, results[i])
+    return results
 
 if __name__ == "__main__":
     docx_file = r"Manual Introduction.docx"
@@ -0,0 +1,248 @@
+"""
+Lightweight span tracing for humanizer jobs.
+
+Spans form a tree (job -> chunk -> mark -> dialog attempt) and each finished
+trace is written as an OTLP/JSON file, the same layout the OpenTelemetry
+collector's file exporter produces, so it can be opened in Jaeger or any other
+OpenTelemetry-aware trace viewer.
+
+Tracing is disabled unless HUMANIZER_TRACE_DIR is set or configure_tracing()
+is called; when disabled every span is a shared no-op object.
+
+Work handed to another process continues the trace through a SpanContext
+(trace and span id, picklable) taken with current_span_context(). Spans
+started under it are exported by that process as a separate file of the
+same trace, which trace viewers join with the rest by trace id.
+"""
+import json
+import os
+import re
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+SERVICE_NAME = "autohumanize"
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("humanizer_current_span", default=None)
+
+
+def _to_any_value(value: Any) -> Dict[str, Any]:
+    """Convert a Python value to an OTLP AnyValue dict"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanContext(NamedTuple):
+    """Reference to a span in another process"""
+    trace_id: str
+    span_id: str
+
+
+class Span:
+    """A single timed operation with attributes and an optional parent"""
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Optional[Dict[str, Any]] = None, root_id: Optional[str] = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        # Span whose end exports this one: the trace root, or the first span under a remote parent
+        self.root_id = root_id or self.span_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_error(self, error: Any):
+        self.error = str(error)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer._finish(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [{"key": k, "value": _to_any_value(v)} for k, v in self.attributes.items()],
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        if self.error:
+            data["status"] = {"code": STATUS_CODE_ERROR, "message": self.error}
+        return data
+
+
+class _NoopSpan:
+    """Span stand-in used while tracing is disabled"""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Collects spans per trace and exports each trace when its root span ends.
+
+    Args:
+        output_dir: str - Directory that receives one JSON file per trace
+        service_name: str - Value of the service.name resource attribute
+    """
+
+    def __init__(self, output_dir: str, service_name: str = SERVICE_NAME):
+        self.output_dir = output_dir
+        self.service_name = service_name
+        self._spans: Dict[str, List[Span]] = {}
+        # Root spans that have started and not yet ended
+        self._open_roots = set()
+        self._lock = Lock()
+
+    def start_span(self, name: str, parent: Union[Span, SpanContext, None] = None, **attributes) -> Span:
+        """
+        Start a span under *parent* (a span of this process or the SpanContext
+        of one in another process), or under the current span of this context
+        """
+        if isinstance(parent, SpanContext):
+            started = Span(self, name, parent.trace_id, parent.span_id, attributes)
+        else:
+            if parent is None or isinstance(parent, _NoopSpan):
+                parent = _current_span.get()
+            if parent is not None and parent.trace_id is not None:
+                return Span(self, name, parent.trace_id, parent.span_id, attributes, root_id=parent.root_id)
+            started = Span(self, name, secrets.token_hex(16), None, attributes)
+        with self._lock:
+            self._open_roots.add(started.span_id)
+        return started
+
+    @contextmanager
+    def span(self, name: str, parent: Union[Span, SpanContext, None] = None, **attributes):
+        """Context manager that starts a span and makes it current for the block"""
+        current = self.start_span(name, parent=parent, **attributes)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            current.end()
+
+    def _finish(self, span: Span):
+        with self._lock:
+            spans = self._spans.setdefault(span.root_id, [])
+            spans.append(span)
+            # A span ending after its root (e.g. a chunk still running on a scheduler
+            # thread when the job gave up waiting) is exported on its own
+            if span.root_id != span.span_id and span.root_id in self._open_roots:
+                return
+            self._open_roots.discard(span.root_id)
+            del self._spans[span.root_id]
+        self.export(span, spans)
+
+    def export(self, root: Span, spans: List[Span]) -> Optional[str]:
+        """Write a finished trace to disk and return the file path"""
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": _to_any_value(self.service_name)},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "humanizer"},
+                    "spans": [s.to_otlp() for s in spans],
+                }],
+            }]
+        }
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', root.name)
+        # Parts of a trace exported by other processes get their own file
+        suffix = f"_{root.span_id}" if root.parent_id else ""
+        path = os.path.join(self.output_dir, f"{safe_name}_{root.trace_id}{suffix}.json")
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            return path
+        except OSError:
+            return None
+
+
+class _NoopTracer:
+    """Tracer used while tracing is disabled"""
+
+    def start_span(self, name, parent=None, **attributes):
+        return NOOP_SPAN
+
+    @contextmanager
+    def span(self, name, parent=None, **attributes):
+        yield NOOP_SPAN
+
+
+_tracer = Tracer(os.environ["HUMANIZER_TRACE_DIR"]) if os.environ.get("HUMANIZER_TRACE_DIR") else _NoopTracer()
+
+
+def configure_tracing(output_dir: Optional[str]):
+    """
+    Enable tracing into *output_dir*, or disable it when None is given.
+    """
+    global _tracer
+    _tracer = Tracer(output_dir) if output_dir else _NoopTracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def span(name: str, parent: Union[Span, SpanContext, None] = None, **attributes):
+    """Shortcut for get_tracer().span(...)"""
+    return _tracer.span(name, parent=parent, **attributes)
+
+
+def current_span():
+    """Return the active span of this context, or a no-op span"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def current_span_context() -> Optional[SpanContext]:
+    """Picklable reference to the active span, for continuing the trace in another process"""
+    current = _current_span.get()
+    return SpanContext(current.trace_id, current.span_id) if current is not None else None